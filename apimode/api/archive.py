@@ -0,0 +1,90 @@
+"""
+Empaquetado en memoria de módulos generados (zip / tar) emitido por chunks
+"""
+
+import io
+import tarfile
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+from model_types import RenderedFile
+
+# formato -> (media type sin compresión, con compresión)
+ARCHIVE_FORMATS = {
+    'zip': ('application/zip', 'application/zip'),
+    'tar': ('application/x-tar', 'application/gzip')
+}
+
+
+class _ChunkBuffer:
+    """Destino de escritura no posicionable: acumula bytes hasta que se drenan"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def archive_info(entity_name: str, archive_format: str, compress: bool) -> Tuple[str, str]:
+    """Nombre de archivo y media type del archivo comprimido"""
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Formato no soportado: {archive_format}. Opciones: {', '.join(ARCHIVE_FORMATS)}")
+
+    extension = '.zip' if archive_format == 'zip' else ('.tar.gz' if compress else '.tar')
+    return f"{entity_name}{extension}", ARCHIVE_FORMATS[archive_format][1 if compress else 0]
+
+
+def iter_archive(
+    files: Iterable[RenderedFile],
+    archive_format: str = 'zip',
+    compress: bool = True,
+    root: str = ''
+) -> Iterator[bytes]:
+    """Genera el archivo por partes, un chunk por archivo agregado
+
+    Nada se escribe en disco: zipfile y tarfile escriben sobre un buffer no
+    posicionable que se vacía después de cada entrada.
+    """
+    buffer = _ChunkBuffer()
+    prefix = f"{root.strip('/')}/" if root else ''
+    mtime = time.time()
+
+    if archive_format == 'zip':
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with zipfile.ZipFile(buffer, 'w', compression=compression) as archive:
+            date_time = time.localtime(mtime)[:6]
+            for file in files:
+                info = zipfile.ZipInfo(prefix + file.path, date_time=date_time)
+                info.compress_type = compression
+                info.external_attr = 0o644 << 16
+                archive.writestr(info, file.content)
+                yield buffer.drain()
+    elif archive_format == 'tar':
+        with tarfile.open(fileobj=buffer, mode='w|gz' if compress else 'w|') as archive:
+            for file in files:
+                data = file.content.encode('utf-8')
+                info = tarfile.TarInfo(prefix + file.path)
+                info.size = len(data)
+                info.mtime = int(mtime)
+                info.mode = 0o644
+                archive.addfile(info, io.BytesIO(data))
+                yield buffer.drain()
+    else:
+        raise ValueError(f"Formato no soportado: {archive_format}")
+
+    # Directorio central (zip) o bloques finales (tar)
+    tail = buffer.drain()
+    if tail:
+        yield tail
@@ -6,35 +6,173 @@ Procesa templates y genera código completo usando Jinja2 (equivalente a Handleb
 import os
 import shutil
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Mapping, Tuple
+from types import MappingProxyType
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-import glob
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+import tempfile
 import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from model_types import (
     CRUDGeneratorConfig, GenerationResult, GeneratorOptions,
-    TemplateContext, GeneratedFile, FieldType
+    TemplateContext, GeneratedFile, FieldType, BatchGenerationResult,
+    RenderedFile, CRUDGeneratorError
 )
 from utils import StringUtils, FileUtils, Logger, TemplateUtils
 from validators import CRUDValidator
+from metrics import PhaseTimer, TEMPLATE_RENDER_SECONDS, GENERATED_FILES_TOTAL, GENERATED_BYTES_TOTAL
+from template_manifest import TemplateManifest, TemplateEntry, TEMPLATE_SUFFIX
+from generation_manifest import GenerationManifest, ManifestFile, MANIFEST_FILENAME
+from result_cache import GenerationCache
+from staging import StagedCommit
+from snapshots import SnapshotStore
+import progress
+import tracing
+import time
+
+# Directorio por defecto del cache de bytecode ('' lo desactiva). Debe ser del usuario
+# del proceso y no escribible por otros: Jinja ejecuta el bytecode que encuentra ahí
+DEFAULT_BYTECODE_CACHE_DIR = os.getenv(
+    'TEMPLATE_BYTECODE_CACHE',
+    str(Path(tempfile.gettempdir()) / 'mcp-creator-jinja')
+)
+
+GENERATOR_VERSION = '1.0.0'
+README_FILENAME = 'README.md'
+
+# Hilos dedicados al render de templates
+DEFAULT_RENDER_WORKERS = int(os.getenv('TEMPLATE_RENDER_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+# Lotes con al menos este número de entidades se renderizan en procesos
+DEFAULT_BATCH_PROCESS_THRESHOLD = int(os.getenv('GENERATE_BATCH_PROCESS_THRESHOLD', '8'))
+DEFAULT_BATCH_PROCESSES = int(os.getenv('GENERATE_BATCH_PROCESSES', str(os.cpu_count() or 1)))
 
 class CRUDGenerator:
     """Clase principal del generador CRUD"""
     
-    def __init__(self, templates_path: Optional[str] = None):
+    def __init__(
+        self,
+        templates_path: Optional[str] = None,
+        template_cache_size: int = 64,
+        bytecode_cache_dir: Optional[str] = DEFAULT_BYTECODE_CACHE_DIR,
+        render_workers: int = DEFAULT_RENDER_WORKERS,
+        batch_processes: int = DEFAULT_BATCH_PROCESSES,
+        result_cache: Optional[GenerationCache] = None,
+        snapshot_store: Optional[SnapshotStore] = None
+    ):
         current_dir = Path(__file__).parent
         self.templates_path = templates_path or str(current_dir / "templates" / "crud")
         
-        # Configurar Jinja2 (equivalente a Handlebars en TypeScript)
+        # Cache persistente de bytecode: workers nuevos arrancan sin recompilar.
+        # Jinja valida cada entrada contra el checksum del código fuente.
+        self.bytecode_cache_dir = bytecode_cache_dir or None
+        bytecode_cache = None
+        if self.bytecode_cache_dir:
+            try:
+                FileUtils.ensure_private_directory(self.bytecode_cache_dir)
+                bytecode_cache = FileSystemBytecodeCache(self.bytecode_cache_dir)
+            except OSError as e:
+                Logger.warning("Cache de bytecode desactivado: %s", e)
+                self.bytecode_cache_dir = None
+        
+        # Configurar Jinja2 (equivalente a Handlebars en TypeScript).
+        # Los templates compilados quedan en un cache LRU acotado; auto_reload
+        # compara el mtime del archivo para que las ediciones tengan efecto.
         self.jinja_env = Environment(
             loader=FileSystemLoader(self.templates_path),
             autoescape=select_autoescape(['html', 'xml']),
             trim_blocks=True,
-            lstrip_blocks=True
+            lstrip_blocks=True,
+            cache_size=template_cache_size,
+            auto_reload=True,
+            bytecode_cache=bytecode_cache
         )
         
         self._register_helpers()
+        
+        # Índice de templates construido al inicio (sin escaneos por request)
+        self.manifest = TemplateManifest(
+            self.templates_path,
+            resolve_output=self._resolve_output_pattern,
+            get_file_type=self._get_file_type
+        )
+        
+        # Pool de render: el event loop solo coordina y hace E/S asíncrona
+        self.render_workers = max(render_workers, 1)
+        self._render_pool: Optional[ThreadPoolExecutor] = None
+        
+        # Resultados renderizados por configuración (omite validación y render al repetir)
+        self.result_cache = result_cache if result_cache is not None else GenerationCache()
+        
+        # Versiones anteriores de archivos editados a mano (fuera del proyecto)
+        self.snapshots = snapshot_store if snapshot_store is not None else SnapshotStore()
+        
+        # Pool de procesos para lotes grandes (se crea al primer uso)
+        self.batch_processes = max(batch_processes, 1)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+    
+    async def warm_up(self, start_process_pool: bool = False) -> Dict[str, Any]:
+        """Compila todos los templates (y opcionalmente arranca el pool de procesos)
+        
+        Pensado para el arranque del servidor: la primera generación no paga la
+        compilación de Jinja ni el spawn de los procesos de lote.
+        """
+        started = time.perf_counter()
+        entries = self.manifest.entries()
+        loop = asyncio.get_running_loop()
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(self._render_executor, self.jinja_env.get_template, entry.name) for entry in entries),
+            return_exceptions=True
+        )
+        failed = [entry.name for entry, outcome in zip(entries, outcomes) if isinstance(outcome, Exception)]
+        for name in failed:
+            Logger.warning("No se pudo compilar el template %s", name)
+        
+        if start_process_pool:
+            pool = self._get_process_pool()
+            # Un submit por proceso fuerza el spawn y la inicialización de cada worker
+            await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(self.batch_processes)))
+        
+        return {
+            'templates': len(entries) - len(failed),
+            'failed': failed,
+            'process_pool': self._process_pool is not None,
+            'ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+    
+    @property
+    def _render_executor(self) -> ThreadPoolExecutor:
+        """Pool de render (se recrea si el generador se usa después de shutdown)"""
+        if self._render_pool is None:
+            self._render_pool = ThreadPoolExecutor(
+                max_workers=self.render_workers,
+                thread_name_prefix='template-render'
+            )
+        return self._render_pool
+    
+    def shutdown(self) -> None:
+        """Libera los pools de render"""
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=True)
+            self._render_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+            self._process_pool = None
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Pool de procesos cuyos workers mantienen su propio generador (templates compilados)"""
+        if self._process_pool is None:
+            # spawn: el proceso padre tiene hilos activos (logging, pools)
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.batch_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_render_worker,
+                initargs=(self.templates_path, self.bytecode_cache_dir, self.jinja_env.cache.capacity if self.jinja_env.cache is not None else 0)
+            )
+        return self._process_pool
     
     def _register_helpers(self) -> None:
         """Registra helpers personalizados para Jinja2 (equivalente a Handlebars helpers)"""
@@ -83,6 +221,21 @@ class CRUDGenerator:
         self.jinja_env.globals['ifFirst'] = if_first
         self.jinja_env.globals['ifLast'] = if_last
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """Estado del cache de templates compilados"""
+        cache = self.jinja_env.cache
+        return {
+            'compiled_templates': len(cache) if cache is not None else 0,
+            'capacity': cache.capacity if cache is not None else 0,
+            'bytecode_cache_dir': self.bytecode_cache_dir,
+            'render_workers': self.render_workers,
+            'render_pool_started': self._render_pool is not None,
+            'batch_processes': self.batch_processes,
+            'process_pool_started': self._process_pool is not None,
+            'results': self.result_cache.stats(),
+            'manifest': self.manifest.summary()
+        }
+    
     def _get_typescript_type(self, field_type: str) -> str:
         """Obtiene tipo TypeScript desde tipo de campo (equivalente a getTypeScriptType de Handlebars)"""
         type_mapping = {
@@ -107,119 +260,514 @@ class CRUDGenerator:
         if options.verbose:
             Logger.set_verbose(True)
         
-        try:
-            Logger.info(f"Iniciando generación de CRUD para {config.entity_name}")
-            
-            # 1. Validar configuración
-            if not options.skip_validation:
-                Logger.step(1, 6, 'Validando configuración')
-                validation = CRUDValidator.validate(config.model_dump(by_alias=True))
+        with tracing.span('generate', entity=config.entity_name):
+            try:
+                Logger.info("Iniciando generación de CRUD para %s", config.entity_name)
                 
-                if not validation.valid:
-                    return GenerationResult(
-                        success=False,
-                        message='Configuración inválida',
-                        files_created=[],
-                        errors=[f"{e.field}: {e.message}" for e in validation.errors]
-                    )
+                previous = await self._load_manifest(config)
+                config_hash = GenerationManifest.hash_config(config, GENERATOR_VERSION)
+                timestamp = self._reusable_timestamp(config_hash, previous)
+                cached = self.result_cache.get(self._cache_key(config_hash), timestamp)
                 
-                for warning in validation.warnings:
-                    Logger.warning(warning)
-            
-            # 2. Verificar permisos de escritura
-            Logger.step(2, 6, 'Verificando permisos de directorio')
-            path_validation = await CRUDValidator.validate_target_path(config.target_path)
+                tracing.annotate(cached=cached is not None)
+                
+                # 1-2. Validar configuración (ya validada si está en cache) y permisos de escritura
+                invalid = await self._validate_config(config, options, check_config=cached is None)
+                if invalid:
+                    tracing.annotate(success=False)
+                    return invalid
+                
+                # 3. Crear contexto de template
+                Logger.step(3, 6, 'Preparando contexto de templates')
+                with tracing.span('generate.template_context'):
+                    if cached:
+                        Logger.debug("Resultado en cache para %s", config.entity_name)
+                        context = self._create_template_context(config, cached.timestamp)
+                    else:
+                        context = self._create_template_context(config, timestamp)
+                
+                result = await self._generate_files(
+                    config,
+                    context,
+                    options,
+                    cached.files if cached else None,
+                    previous,
+                    cacheable=cached is None,
+                    config_hash=config_hash
+                )
+                tracing.annotate(success=result.success, files=len(result.files_created))
+                return result
             
-            if not path_validation.valid:
+            except Exception as e:
+                Logger.error("Error fatal en generación: %s", e)
+                tracing.fail(str(e))
+                
                 return GenerationResult(
                     success=False,
-                    message='Error de permisos en directorio destino',
+                    message='Error fatal durante la generación',
                     files_created=[],
-                    errors=[e.message for e in path_validation.errors]
+                    errors=[str(e)]
                 )
+    
+    async def generate_batch(
+        self,
+        configs: List[CRUDGeneratorConfig],
+        options: GeneratorOptions = None,
+        process_threshold: int = DEFAULT_BATCH_PROCESS_THRESHOLD
+    ) -> BatchGenerationResult:
+        """Genera varios módulos CRUD en una sola operación
+        
+        Todas las configuraciones se validan antes de escribir nada. Los lotes de
+        al menos process_threshold entidades se renderizan en un pool de procesos
+        (el render de Jinja es CPU y el GIL impide escalar con hilos); los más
+        pequeños usan el pool de render del generador. Las escrituras siempre
+        ocurren en este proceso con E/S asíncrona.
+        """
+        if options is None:
+            options = GeneratorOptions()
+        
+        timer = PhaseTimer(report=True, trace='generate_batch')
+        use_processes = len(configs) >= max(process_threshold, 1)
+        mode = 'process' if use_processes else 'thread'
+        tracing.annotate(entities=len(configs), mode=mode)
+        
+        # 1. Validar todo el lote antes de generar
+        invalid = await asyncio.gather(*(self._validate_config(config, options) for config in configs))
+        errors = [
+            f"{config.entity_name}: múltiples entidades con el mismo targetPath ({config.target_path})"
+            for index, config in enumerate(configs)
+            if any(os.path.abspath(other.target_path) == os.path.abspath(config.target_path) for other in configs[:index])
+        ]
+        timer.lap('validate')
+        
+        if errors or any(invalid):
+            invalid_count = sum(1 for result in invalid if result) + len(errors)
+            results = []
+            for config, result in zip(configs, invalid):
+                result = result or GenerationResult(
+                    success=False,
+                    message='No generado: el lote contiene configuraciones inválidas',
+                    files_created=[]
+                )
+                result.entity_name = config.entity_name
+                results.append(result)
+                errors.extend(f"{config.entity_name}: {error}" for error in result.errors or [])
             
-            # 3. Crear contexto de template
-            Logger.step(3, 6, 'Preparando contexto de templates')
-            context = self._create_template_context(config)
+            return BatchGenerationResult(
+                success=False,
+                message=f"Lote inválido: {invalid_count} de {len(configs)} configuraciones con errores",
+                mode=mode,
+                results=results,
+                errors=errors,
+                timings=timer.as_dict()
+            )
+        
+        # 2. Render (en procesos para lotes grandes)
+        previous_manifests = await asyncio.gather(*(self._load_manifest(config) for config in configs))
+        config_hashes = [GenerationManifest.hash_config(config, GENERATOR_VERSION) for config in configs]
+        contexts = []
+        prerendered = []
+        for config, config_hash, previous in zip(configs, config_hashes, previous_manifests):
+            timestamp = self._reusable_timestamp(config_hash, previous)
+            cached = self.result_cache.get(self._cache_key(config_hash), timestamp)
+            contexts.append(self._create_template_context(config, cached.timestamp if cached else timestamp))
+            prerendered.append(cached.files if cached else None)
+        cached_flags = [rendered is not None for rendered in prerendered]
+        
+        pending = [index for index, rendered in enumerate(prerendered) if rendered is None]
+        if use_processes and pending:
+            loop = asyncio.get_running_loop()
+            pool = self._get_process_pool()
+            outcomes = await asyncio.gather(
+                *(loop.run_in_executor(pool, _render_entity_in_worker, contexts[index]) for index in pending),
+                return_exceptions=True
+            )
+            for index, outcome in zip(pending, outcomes):
+                # Si el worker falla se renderiza localmente
+                if not isinstance(outcome, Exception):
+                    rendered, failed = outcome
+                    prerendered[index] = {**rendered, **{name: Exception(error) for name, error in failed.items()}}
+            timer.lap('render')
+        
+        # 3. Escribir archivos de todas las entidades
+        completed = 0
+        
+        async def generate_entity(config, config_hash, context, rendered, previous, cached) -> GenerationResult:
+            nonlocal completed
+            result = None
+            try:
+                with tracing.span('generate_batch.entity', entity=config.entity_name, cached=cached):
+                    result = await self._generate_files(
+                        config, context, options, rendered, previous, cacheable=not cached, config_hash=config_hash
+                    )
+                    tracing.annotate(success=result.success, files=len(result.files_created))
+                return result
+            finally:
+                completed += 1
+                progress.report(
+                    'entity',
+                    entity=config.entity_name,
+                    success=bool(result and result.success),
+                    completed=completed,
+                    total=len(configs)
+                )
+        
+        outcomes = await asyncio.gather(
+            *(
+                generate_entity(*entity)
+                for entity in zip(configs, config_hashes, contexts, prerendered, previous_manifests, cached_flags)
+            ),
+            return_exceptions=True
+        )
+        timer.lap('write' if use_processes else 'generate')
+        
+        results = []
+        for config, outcome in zip(configs, outcomes):
+            if isinstance(outcome, Exception):
+                outcome = GenerationResult(
+                    success=False,
+                    message='Error fatal durante la generación',
+                    files_created=[],
+                    errors=[str(outcome)]
+                )
+            outcome.entity_name = config.entity_name
+            results.append(outcome)
+        
+        failed = [result for result in results if not result.success]
+        total_files = sum(len(result.files_created) for result in results)
+        
+        return BatchGenerationResult(
+            success=not failed,
+            message=(
+                f"Lote generado exitosamente ({len(configs)} entidades, {total_files} archivos)"
+                if not failed else
+                f"Lote completado con errores ({len(failed)} de {len(configs)} entidades)"
+            ),
+            mode=mode,
+            results=results,
+            errors=[f"{result.entity_name}: {error}" for result in failed for error in result.errors or []] or None,
+            timings=timer.as_dict()
+        )
+    
+    async def render_module(self, config: CRUDGeneratorConfig, options: GeneratorOptions = None) -> List[RenderedFile]:
+        """Renderiza el módulo completo en memoria, sin tocar el directorio destino
+        
+        Lanza CRUDGeneratorError si la configuración es inválida o falla algún template.
+        """
+        if options is None:
+            options = GeneratorOptions()
+        
+        cache_key = self._cache_key(GenerationManifest.hash_config(config, GENERATOR_VERSION))
+        cached = self.result_cache.get(cache_key)
+        
+        if cached is None:
+            invalid = self._check_config(config, options)
+            if invalid:
+                raise CRUDGeneratorError(invalid.message, 'INVALID_CONFIG', invalid.errors)
+        
+        template_entries = self.manifest.entries()
+        if len(template_entries) == 0:
+            raise CRUDGeneratorError(
+                'No se encontraron templates',
+                'TEMPLATES_NOT_FOUND',
+                [f"Templates no encontrados en: {self.templates_path}"]
+            )
+        
+        context = self._create_template_context(config, cached.timestamp if cached else None)
+        render_context = self._create_render_context(context)
+        
+        if cached is not None:
+            outcomes = [cached.files[entry.name] for entry in template_entries]
+        else:
+            loop = asyncio.get_running_loop()
+            outcomes = await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._render_executor, self._render_template, entry, render_context)
+                    for entry in template_entries
+                ),
+                return_exceptions=True
+            )
             
-            # 4. Buscar y procesar templates
-            Logger.step(4, 6, 'Localizando templates')
-            template_files = await self._find_template_files()
+            errors = [
+                f"Error procesando {entry.path}: {str(outcome)}"
+                for entry, outcome in zip(template_entries, outcomes)
+                if isinstance(outcome, Exception)
+            ]
+            if errors:
+                raise CRUDGeneratorError('Error renderizando templates', 'RENDER_FAILED', errors)
+            
+            if not options.skip_validation:
+                self.result_cache.put(
+                    cache_key,
+                    context.TIMESTAMP,
+                    {entry.name: content for entry, content in zip(template_entries, outcomes)}
+                )
+        
+        files = [
+            RenderedFile(
+                path=self._manifest_key(entry.output_pattern, render_context),
+                type=entry.file_type,
+                content=content
+            )
+            for entry, content in zip(template_entries, outcomes)
+        ]
+        files.append(RenderedFile(path=README_FILENAME, type='other', content=self._generate_readme_content(context)))
+        return files
+    
+    async def _validate_config(
+        self,
+        config: CRUDGeneratorConfig,
+        options: GeneratorOptions,
+        check_config: bool = True
+    ) -> Optional[GenerationResult]:
+        """Valida la configuración y el directorio destino; retorna el resultado de error o None"""
+        if check_config:
+            invalid = self._check_config(config, options)
+            if invalid:
+                return invalid
+        
+        # 2. Verificar permisos de escritura
+        Logger.step(2, 6, 'Verificando permisos de directorio')
+        with tracing.span('generate.check_target_path'):
+            path_validation = await CRUDValidator.validate_target_path(config.target_path)
+        
+        if not path_validation.valid:
+            return GenerationResult(
+                success=False,
+                message='Error de permisos en directorio destino',
+                files_created=[],
+                errors=[e.message for e in path_validation.errors]
+            )
+        
+        return None
+    
+    def _check_config(self, config: CRUDGeneratorConfig, options: GeneratorOptions) -> Optional[GenerationResult]:
+        """Validación estructural de la configuración (sin acceso a disco)"""
+        # 1. Validar configuración
+        if not options.skip_validation:
+            Logger.step(1, 6, 'Validando configuración')
+            with tracing.span('generate.validate_config', fields=len(config.fields)):
+                validation = CRUDValidator.validate_model(config)
             
-            if len(template_files) == 0:
+            if not validation.valid:
                 return GenerationResult(
                     success=False,
-                    message='No se encontraron templates',
+                    message='Configuración inválida',
                     files_created=[],
-                    errors=[f"Templates no encontrados en: {self.templates_path}"]
+                    errors=[f"{e.field}: {e.message}" for e in validation.errors]
                 )
             
-            Logger.debug(f"Encontrados {len(template_files)} templates")
-            
-            # 5. Generar archivos
-            Logger.step(5, 6, 'Generando archivos')
-            generated_files = []
-            errors = []
-            
-            for template_file in template_files:
-                try:
-                    generated = await self._process_template(
-                        template_file,
-                        context,
+            for warning in validation.warnings:
+                Logger.warning(warning)
+        
+        return None
+    
+    async def _generate_files(
+        self,
+        config: CRUDGeneratorConfig,
+        context: TemplateContext,
+        options: GeneratorOptions,
+        prerendered: Optional[Dict[str, Any]] = None,
+        previous: Optional[GenerationManifest] = None,
+        cacheable: bool = True,
+        config_hash: Optional[str] = None
+    ) -> GenerationResult:
+        """Renderiza y escribe los archivos de una entidad ya validada
+        
+        prerendered contiene el contenido (o la excepción) de cada template cuando el
+        render se hizo en otro proceso o viene del cache de resultados. previous es el
+        manifiesto de la generación anterior, usado para omitir lo que no cambió. Si
+        cacheable y se renderizaron todos los templates, el resultado queda en cache.
+        config_hash evita volver a serializar la configuración si el llamador ya lo calculó.
+        """
+        timer = PhaseTimer(report=True, entity=config.entity_name)
+        render_context = self._create_render_context(context)
+        previous_files = previous.files if previous else {}
+        config_hash = config_hash or GenerationManifest.hash_config(config, GENERATOR_VERSION)
+        reuse = previous is not None and previous.config_hash == config_hash
+        
+        # 4. Buscar y procesar templates
+        Logger.step(4, 6, 'Localizando templates')
+        with tracing.span('generate.locate_templates'):
+            template_entries = self.manifest.entries()
+            tracing.annotate(templates=len(template_entries))
+        
+        if len(template_entries) == 0:
+            return GenerationResult(
+                success=False,
+                message='No se encontraron templates',
+                files_created=[],
+                errors=[f"Templates no encontrados en: {self.templates_path}"]
+            )
+        
+        Logger.debug("Encontrados %d templates", len(template_entries))
+        
+        # 5. Generar archivos (render en el pool y escrituras concurrentes)
+        Logger.step(5, 6, 'Generando archivos')
+        generated_files = []
+        errors = []
+        rendered = {}
+        
+        # Todas las salidas se publican juntas al final (nada se escribe si hay errores)
+        staged = None if options.dry_run else StagedCommit(config.target_path, snapshots=self.snapshots)
+        completed = 0
+        
+        async def process(entry: TemplateEntry) -> Optional[GeneratedFile]:
+            nonlocal completed
+            started = time.perf_counter()
+            outcome, status = None, 'error'
+            try:
+                with tracing.span('generate.template', template=entry.name):
+                    outcome = await self._process_template(
+                        entry,
+                        render_context,
                         config.target_path,
                         options.overwrite,
-                        options.dry_run
+                        options.dry_run,
+                        prerendered.get(entry.name) if prerendered else None,
+                        previous_files.get(self._manifest_key(entry.output_pattern, render_context)),
+                        reuse,
+                        rendered,
+                        staged
                     )
-                    
-                    if generated:
-                        generated_files.append(generated)
-                        Logger.debug(f"✓ {generated.path}")
-                
-                except Exception as e:
-                    error_msg = f"Error procesando {template_file}: {str(e)}"
-                    errors.append(error_msg)
-                    Logger.error(error_msg)
-            
-            # 6. Crear archivo README
-            Logger.step(6, 6, 'Creando documentación')
-            readme_file = await self._generate_readme(context, config.target_path, options.dry_run)
-            if readme_file:
-                generated_files.append(readme_file)
-            
-            # Resultado final
-            result = GenerationResult(
-                success=len(errors) == 0,
-                message=(
-                    f"CRUD generado exitosamente para {config.entity_name} ({len(generated_files)} archivos)"
-                    if len(errors) == 0 else
-                    f"Generación completada con errores ({len(generated_files)} archivos creados, {len(errors)} errores)"
-                ),
-                files_created=[f.path for f in generated_files],
-                errors=errors if errors else None
-            )
-            
-            # Log de resultado
-            if result.success:
-                Logger.success(result.message)
-                Logger.info('Archivos generados:')
-                for file in generated_files:
-                    Logger.info(f"  {file.type}: {file.path}")
+                    status = outcome.status if outcome else 'skipped'
+                    tracing.annotate(status=status)
+                return outcome
+            finally:
+                completed += 1
+                progress.report(
+                    'file',
+                    entity=config.entity_name,
+                    template=entry.name,
+                    path=outcome.path if outcome else None,
+                    status=status,
+                    completed=completed,
+                    total=len(template_entries),
+                    ms=round((time.perf_counter() - started) * 1000, 3)
+                )
+        
+        with tracing.span('generate.files', templates=len(template_entries)):
+            outcomes = await asyncio.gather(*(process(entry) for entry in template_entries), return_exceptions=True)
+        timer.lap('templates')
+        
+        manifest_files = {}
+        skipped = 0
+        
+        # gather conserva el orden del manifiesto: el reporte es determinista
+        for entry, outcome in zip(template_entries, outcomes):
+            key = self._manifest_key(entry.output_pattern, render_context)
+            if isinstance(outcome, Exception):
+                error_msg = f"Error procesando {entry.path}: {str(outcome)}"
+                errors.append(error_msg)
+                Logger.error(error_msg)
+            elif outcome:
+                generated_files.append(outcome)
+                manifest_files[key] = ManifestFile(
+                    template=entry.name,
+                    template_hash=entry.content_hash,
+                    output_hash=outcome.content_hash
+                )
+                Logger.file("✓ %s (%s)", outcome.path, outcome.status)
             else:
-                Logger.error(result.message)
+                skipped += 1
             
-            return result
+            # Archivos no procesados conservan su entrada anterior
+            if key not in manifest_files and key in previous_files:
+                manifest_files[key] = previous_files[key]
         
-        except Exception as e:
-            Logger.error(f"Error fatal en generación: {str(e)}")
-            
-            return GenerationResult(
+        if cacheable and not options.skip_validation and not errors and len(rendered) == len(template_entries):
+            self.result_cache.put(self._cache_key(config_hash), context.TIMESTAMP, rendered)
+        
+        # 6. Crear archivo README
+        Logger.step(6, 6, 'Creando documentación')
+        with tracing.span('generate.readme'):
+            readme_file = await self._generate_readme(
+                context,
+                config.target_path,
+                options.dry_run,
+                previous_files.get(README_FILENAME),
+                staged
+            )
+        if readme_file:
+            generated_files.append(readme_file)
+            manifest_files[README_FILENAME] = ManifestFile(output_hash=readme_file.content_hash)
+        timer.lap('readme')
+        
+        changes = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': skipped}
+        for file in generated_files:
+            changes[file.status] += 1
+        
+        if errors:
+            # No publicar un módulo incompleto
+            result = GenerationResult(
                 success=False,
-                message='Error fatal durante la generación',
+                message=f"Generación cancelada: {len(errors)} errores, no se escribió ningún archivo",
                 files_created=[],
-                errors=[str(e)]
+                errors=errors,
+                changes={'created': 0, 'updated': 0, 'unchanged': changes['unchanged'], 'skipped': skipped}
+            )
+            Logger.error(result.message)
+            return result
+        
+        if staged is not None:
+            # El manifiesto para la próxima generación se publica junto con los archivos
+            staged.add(
+                MANIFEST_FILENAME,
+                GenerationManifest(
+                    version=GENERATOR_VERSION,
+                    config_hash=config_hash,
+                    template_set_hash=self.manifest.set_hash,
+                    timestamp=context.TIMESTAMP,
+                    files=manifest_files
+                ).model_dump_json(indent=2)
             )
+            with tracing.span('generate.commit', files=len(staged), bytes=staged.size):
+                snapshot_id = await staged.commit()
+                tracing.annotate(snapshot=snapshot_id)
+            timer.lap('commit')
+            if snapshot_id:
+                Logger.info("Snapshot de archivos sobrescritos: %s", snapshot_id)
+        
+        # Resultado final
+        result = GenerationResult(
+            success=True,
+            message=f"CRUD generado exitosamente para {config.entity_name} ({len(generated_files)} archivos)",
+            files_created=[f.path for f in generated_files],
+            changes=changes
+        )
+        
+        # Log de resultado
+        Logger.success(result.message)
+        Logger.info(
+            "Cambios: %d creados, %d actualizados, %d sin cambios",
+            changes['created'], changes['updated'], changes['unchanged']
+        )
+        Logger.info('Archivos generados:')
+        for file in generated_files:
+            Logger.file("  %s: %s", file.type, file.path, level=logging.INFO)
+        
+        return result
+    
+    async def _load_manifest(self, config: CRUDGeneratorConfig) -> Optional[GenerationManifest]:
+        """Manifiesto de la generación anterior en el directorio destino"""
+        return await GenerationManifest.load(config.target_path)
     
-    def _create_template_context(self, config: CRUDGeneratorConfig) -> TemplateContext:
+    @staticmethod
+    def _reusable_timestamp(config_hash: str, previous: Optional[GenerationManifest]) -> Optional[str]:
+        """TIMESTAMP anterior si la configuración no cambió (salida reproducible)"""
+        if previous is not None and previous.config_hash == config_hash:
+            return previous.timestamp
+        return None
+    
+    def _cache_key(self, config_hash: str) -> str:
+        """Clave del cache de resultados: configuración (hash con la versión) y templates"""
+        return GenerationCache.key(config_hash, self.manifest.set_hash)
+    
+    def _manifest_key(self, output_pattern: str, render_context: Mapping[str, Any]) -> str:
+        """Ruta relativa (posix) de un archivo generado, usada como clave del manifiesto"""
+        return Path(self._process_filename(output_pattern, render_context)).as_posix()
+    
+    def _create_template_context(self, config: CRUDGeneratorConfig, timestamp: Optional[str] = None) -> TemplateContext:
         """Crea el contexto para los templates (equivalente a createTemplateContext de TypeScript)"""
         entity_name = StringUtils.to_pascal_case(config.entity_name)
         entity_name_plural = StringUtils.to_pascal_case(config.entity_name_plural)
@@ -234,107 +782,176 @@ class CRUDGenerator:
             FIELDS=config.fields,
             PERMISSIONS=config.permissions,
             RELATION_ENDPOINTS=config.relation_endpoints or {},
-            TIMESTAMP=datetime.now().isoformat(),
-            VERSION='1.0.0'
+            TIMESTAMP=timestamp or datetime.now().isoformat(),
+            VERSION=GENERATOR_VERSION
         )
     
-    async def _find_template_files(self) -> List[str]:
-        """Busca todos los archivos de template (equivalente a findTemplateFiles de TypeScript)"""
-        patterns = [
-            '**/*.template',
-            '**/*.tsx.template',
-            '**/*.ts.template',
-            '**/*.js.template'
-        ]
+    def _create_render_context(self, context: TemplateContext) -> Mapping[str, Any]:
+        """Serializa el contexto una sola vez para todos los templates de la generación
         
-        files = []
+        Además de los campos de TemplateContext incluye vistas precalculadas para que
+        los templates no repitan los mismos filtros sobre FIELDS:
+        SEARCHABLE_FIELDS, SORTABLE_FIELDS, FILTERABLE_FIELDS y LIST_FIELDS.
+        """
+        data = context.model_dump()
+        fields = data['FIELDS']
         
-        for pattern in patterns:
-            try:
-                found_files = await FileUtils.find_files(pattern, self.templates_path)
-                files.extend(found_files)
-            except Exception:
-                Logger.debug(f"No se encontraron archivos con patrón {pattern}")
+        data.update(
+            SEARCHABLE_FIELDS=tuple(f for f in fields if f['searchable']),
+            SORTABLE_FIELDS=tuple(f for f in fields if f['sortable']),
+            FILTERABLE_FIELDS=tuple(f for f in fields if f['filterable']),
+            LIST_FIELDS=tuple(f for f in fields if f['show_in_list'])
+        )
         
-        return list(set(files))  # Eliminar duplicados
+        # Solo lectura: se comparte entre todos los renders de la generación
+        return MappingProxyType(data)
     
     async def _process_template(
         self,
-        template_path: str,
-        context: TemplateContext,
+        entry: TemplateEntry,
+        render_context: Mapping[str, Any],
         target_base_path: str,
         overwrite: bool,
-        dry_run: bool
+        dry_run: bool,
+        prerendered: Optional[Any] = None,
+        previous: Optional[ManifestFile] = None,
+        reuse: bool = False,
+        rendered: Optional[Dict[str, str]] = None,
+        staged: Optional[StagedCommit] = None
     ) -> Optional[GeneratedFile]:
-        """Procesa un archivo de template individual (equivalente a processTemplate de TypeScript)"""
+        """Procesa un archivo de template individual (equivalente a processTemplate de TypeScript)
+        
+        previous es la entrada del manifiesto anterior. Con reuse (configuración sin
+        cambios), si el template tampoco cambió y el archivo en disco es el que se
+        generó, no se vuelve a renderizar. El contenido obtenido se agrega a rendered.
+        """
         try:
-            # Leer contenido del template
-            with open(template_path, 'r', encoding='utf-8') as f:
-                template_content = f.read()
-            
-            # Compilar template con Jinja2 (equivalente a Handlebars.compile)
-            template = self.jinja_env.from_string(template_content)
-            generated_content = template.render(context.model_dump())
-            
-            # Determinar ruta de destino
-            relative_path = os.path.relpath(template_path, self.templates_path)
-            target_path = os.path.join(target_base_path, relative_path)
-            
-            # Reemplazar variables en el nombre del archivo
-            target_path = self._process_filename(target_path, context)
-            
-            # Remover extensión .template
-            target_path = target_path.replace('.template', '')
-            
-            # Verificar si el archivo ya existe
-            if not overwrite and await FileUtils.exists(target_path):
-                Logger.warning(f"Archivo ya existe: {target_path} (usar --overwrite para sobrescribir)")
-                return None
+            # Determinar ruta de destino reemplazando variables en el nombre del archivo
+            target_path = os.path.join(target_base_path, self._process_filename(entry.output_pattern, render_context))
+            current_hash = await GenerationManifest.hash_file(target_path)
             
-            # Crear backup si existe y se va a sobrescribir
-            if overwrite and await FileUtils.exists(target_path):
-                backup_path = await FileUtils.create_backup(target_path)
-                if backup_path:
-                    Logger.debug(f"Backup creado: {backup_path}")
-            
-            # En modo dry-run, solo simular
-            if dry_run:
-                Logger.info(f"[DRY RUN] Se generaría: {target_path}")
+            if (
+                reuse
+                and previous is not None
+                and previous.template_hash == entry.content_hash
+                and current_hash == previous.output_hash
+            ):
                 return GeneratedFile(
                     path=target_path,
-                    type=self._get_file_type(target_path),
-                    description=f"Template: {os.path.basename(template_path)}"
+                    type=entry.file_type,
+                    description=f"Generated from {os.path.basename(entry.path)}",
+                    status='unchanged',
+                    content_hash=current_hash
                 )
             
-            # Crear directorio si no existe
-            await FileUtils.ensure_directory(os.path.dirname(target_path))
+            if isinstance(prerendered, Exception):
+                raise prerendered
             
-            # Escribir archivo
-            with open(target_path, 'w', encoding='utf-8') as f:
-                f.write(generated_content)
+            generated_content = prerendered
+            if generated_content is None:
+                with tracing.span('generate.template.render', template=entry.name):
+                    generated_content = await asyncio.get_running_loop().run_in_executor(
+                        self._render_executor,
+                        self._render_template,
+                        entry,
+                        render_context
+                    )
+            else:
+                tracing.annotate(prerendered=True)
+            
+            if rendered is not None:
+                rendered[entry.name] = generated_content
             
+            with tracing.span('generate.template.write', path=target_path):
+                return await self._write_output(
+                    target_path,
+                    generated_content,
+                    entry.file_type,
+                    f"Generated from {os.path.basename(entry.path)}",
+                    f"Template: {os.path.basename(entry.path)}",
+                    current_hash,
+                    previous,
+                    overwrite,
+                    dry_run,
+                    staged
+                )
+        
+        except Exception as e:
+            raise Exception(f"Error procesando template {entry.path}: {str(e)}")
+    
+    async def _write_output(
+        self,
+        target_path: str,
+        content: str,
+        file_type: str,
+        description: str,
+        dry_run_description: str,
+        current_hash: Optional[str],
+        previous: Optional[ManifestFile],
+        overwrite: bool,
+        dry_run: bool,
+        staged: Optional[StagedCommit] = None
+    ) -> Optional[GeneratedFile]:
+        """Agrega el archivo al commit de la generación solo si su contenido cambió"""
+        content_hash = GenerationManifest.hash_content(content)
+        
+        if current_hash == content_hash:
+            status = 'unchanged'
+        elif current_hash is None:
+            status = 'created'
+        else:
+            # Verificar si el archivo ya existe
+            if not overwrite:
+                Logger.file("Archivo ya existe: %s (usar --overwrite para sobrescribir)", target_path, level=logging.WARNING)
+                return None
+            status = 'updated'
+        
+        tracing.annotate(status=status)
+        
+        # En modo dry-run, solo simular
+        if dry_run:
+            Logger.file("[DRY RUN] Se generaría: %s (%s)", target_path, status, level=logging.INFO)
             return GeneratedFile(
                 path=target_path,
-                type=self._get_file_type(target_path),
-                description=f"Generated from {os.path.basename(template_path)}"
+                type=file_type,
+                description=dry_run_description,
+                status=status,
+                content_hash=content_hash
             )
         
-        except Exception as e:
-            raise Exception(f"Error procesando template {template_path}: {str(e)}")
-    
-    def _process_filename(self, file_path: str, context: TemplateContext) -> str:
-        """Procesa el nombre del archivo reemplazando variables (equivalente a processFileName de TypeScript)"""
-        processed_path = file_path
+        if status != 'unchanged':
+            # Solo se respaldan archivos que no coinciden con la última generación (editados a mano)
+            staged.add(
+                target_path,
+                content,
+                backup=status == 'updated' and (previous is None or previous.output_hash != current_hash)
+            )
+            
+            size = len(content.encode('utf-8'))
+            GENERATED_FILES_TOTAL.inc(1, file_type)
+            GENERATED_BYTES_TOTAL.inc(size)
+            tracing.annotate(bytes=size)
         
-        # Reemplazar placeholders comunes en nombres de archivo
-        replacements = {
-            '[Entity]': context.ENTITY_NAME,
-            '[entity]': context.ENTITY_NAME_LOWER,
-            '[ENTITY]': context.ENTITY_NAME_UPPER,
-            '[Entities]': context.ENTITY_NAME_PLURAL,
-            '[entities]': context.ENTITY_NAME_PLURAL_LOWER,
-            '[id]': '[id]'  # Preservar [id] para rutas dinámicas de Next.js
-        }
+        return GeneratedFile(
+            path=target_path,
+            type=file_type,
+            description=description,
+            status=status,
+            content_hash=content_hash
+        )
+    
+    def _render_template(self, entry: TemplateEntry, render_context: Mapping[str, Any]) -> str:
+        """Renderiza un template (se ejecuta en el pool de render)"""
+        # Obtener template compilado a través del loader (cacheado)
+        render_start = time.perf_counter()
+        template = self.jinja_env.get_template(entry.name)
+        generated_content = template.render(render_context)
+        TEMPLATE_RENDER_SECONDS.observe(time.perf_counter() - render_start, entry.name)
+        return generated_content
+    
+    def _resolve_output_pattern(self, template_name: str) -> str:
+        """Ruta relativa de salida de un template, con los placeholders aún sin resolver"""
+        processed_path = template_name
         
         # Manejar casos especiales para páginas (equivalente a la lógica de TypeScript)
         if '(pages)' in processed_path:
@@ -358,6 +975,23 @@ class CRUDGenerator:
             if '[id].edit.page.tsx.template' in processed_path:
                 processed_path = processed_path.replace('[id].edit.page.tsx.template', '[id]/edit/page.tsx.template')
         
+        # Remover extensión .template
+        return processed_path[:-len(TEMPLATE_SUFFIX)] if processed_path.endswith(TEMPLATE_SUFFIX) else processed_path
+    
+    def _process_filename(self, file_path: str, render_context: Mapping[str, Any]) -> str:
+        """Procesa el nombre del archivo reemplazando variables (equivalente a processFileName de TypeScript)"""
+        processed_path = file_path
+        
+        # Reemplazar placeholders comunes en nombres de archivo
+        replacements = {
+            '[Entity]': render_context['ENTITY_NAME'],
+            '[entity]': render_context['ENTITY_NAME_LOWER'],
+            '[ENTITY]': render_context['ENTITY_NAME_UPPER'],
+            '[Entities]': render_context['ENTITY_NAME_PLURAL'],
+            '[entities]': render_context['ENTITY_NAME_PLURAL_LOWER'],
+            '[id]': '[id]'  # Preservar [id] para rutas dinámicas de Next.js
+        }
+        
         for placeholder, replacement in replacements.items():
             processed_path = processed_path.replace(placeholder, replacement)
         
@@ -383,30 +1017,29 @@ class CRUDGenerator:
         self,
         context: TemplateContext,
         target_path: str,
-        dry_run: bool
+        dry_run: bool,
+        previous: Optional[ManifestFile] = None,
+        staged: Optional[StagedCommit] = None
     ) -> Optional[GeneratedFile]:
         """Genera archivo README con documentación (equivalente a generateReadme de TypeScript)"""
         readme_content = self._generate_readme_content(context)
-        readme_path = os.path.join(target_path, 'README.md')
-        
-        if dry_run:
-            Logger.info(f"[DRY RUN] Se generaría: {readme_path}")
-            return GeneratedFile(
-                path=readme_path,
-                type='other',
-                description='Documentation file'
-            )
+        readme_path = os.path.join(target_path, README_FILENAME)
         
         try:
-            with open(readme_path, 'w', encoding='utf-8') as f:
-                f.write(readme_content)
-            return GeneratedFile(
-                path=readme_path,
-                type='other',
-                description='Generated documentation'
+            return await self._write_output(
+                readme_path,
+                readme_content,
+                'other',
+                'Generated documentation',
+                'Documentation file',
+                await GenerationManifest.hash_file(readme_path),
+                previous,
+                overwrite=True,
+                dry_run=dry_run,
+                staged=staged
             )
         except Exception as e:
-            Logger.error(f"Error generando README: {str(e)}")
+            Logger.error("Error generando README: %s", e)
             return None
     
     def _generate_readme_content(self, context: TemplateContext) -> str:
@@ -564,16 +1197,43 @@ Generated by MCP CRUD Generator v{context.VERSION}
         try:
             exists = await FileUtils.exists(self.templates_path)
             if not exists:
-                Logger.error(f"Directorio de templates no encontrado: {self.templates_path}")
+                Logger.error("Directorio de templates no encontrado: %s", self.templates_path)
                 return False
             
-            templates = await self._find_template_files()
+            templates = self.manifest.entries()
             if len(templates) == 0:
-                Logger.error(f"No se encontraron templates en: {self.templates_path}")
+                Logger.error("No se encontraron templates en: %s", self.templates_path)
                 return False
             
-            Logger.debug(f"Templates válidos encontrados: {len(templates)}")
+            Logger.debug("Templates válidos encontrados: %d", len(templates))
             return True
         except Exception as e:
-            Logger.error(f"Error validando templates: {str(e)}")
-            return False
\ No newline at end of file
+            Logger.error("Error validando templates: %s", e)
+            return False
+
+
+# Generador propio de cada proceso del pool de lotes
+_worker_generator: Optional[CRUDGenerator] = None
+
+def _init_render_worker(templates_path: str, bytecode_cache_dir: Optional[str], template_cache_size: int) -> None:
+    """Inicializa el worker: compila los templates una vez y los reutiliza para todo el lote"""
+    global _worker_generator
+    _worker_generator = CRUDGenerator(
+        templates_path,
+        template_cache_size=template_cache_size,
+        bytecode_cache_dir=bytecode_cache_dir,
+        render_workers=1,
+        batch_processes=1
+    )
+
+def _render_entity_in_worker(context: TemplateContext) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Renderiza todos los templates de una entidad; retorna (contenidos, errores) por template"""
+    render_context = _worker_generator._create_render_context(context)
+    rendered = {}
+    failed = {}
+    for entry in _worker_generator.manifest.entries():
+        try:
+            rendered[entry.name] = _worker_generator._render_template(entry, render_context)
+        except Exception as e:
+            failed[entry.name] = str(e)
+    return rendered, failed
@@ -0,0 +1,63 @@
+"""
+Manifiesto de generación guardado en el directorio destino: hashes de la
+configuración, de los templates y de cada archivo generado
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Union
+
+import aiofiles
+from pydantic import BaseModel
+
+from model_types import CRUDGeneratorConfig
+
+MANIFEST_FILENAME = '.mcp-generator.json'
+
+
+class ManifestFile(BaseModel):
+    """Último resultado generado para un archivo (ruta relativa como clave)"""
+    template: Optional[str] = None  # None para archivos que no salen de un template (README)
+    template_hash: Optional[str] = None
+    output_hash: str
+
+
+class GenerationManifest(BaseModel):
+    """Entradas y salidas de la última generación en un directorio"""
+    version: str
+    config_hash: str
+    template_set_hash: str
+    timestamp: str  # TIMESTAMP del contexto, reutilizado si la configuración no cambia
+    files: Dict[str, ManifestFile] = {}
+
+    @staticmethod
+    def hash_config(config: CRUDGeneratorConfig, version: str) -> str:
+        """Hash canónico de la configuración (sin el directorio destino) y la versión"""
+        data = config.model_dump(mode='json', by_alias=True, exclude={'target_path'})
+        canonical = json.dumps({'version': version, 'config': data}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def hash_content(content: Union[str, bytes]) -> str:
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return hashlib.sha256(content).hexdigest()
+
+    @classmethod
+    async def hash_file(cls, file_path: str) -> Optional[str]:
+        """Hash del archivo en disco (None si no existe)"""
+        try:
+            async with aiofiles.open(file_path, 'rb') as f:
+                return cls.hash_content(await f.read())
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    @classmethod
+    async def load(cls, target_path: str) -> Optional['GenerationManifest']:
+        """Lee el manifiesto del directorio; None si no existe o es inválido"""
+        try:
+            async with aiofiles.open(os.path.join(target_path, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+                return cls.model_validate_json(await f.read())
+        except Exception:
+            return None
@@ -0,0 +1,657 @@
+"""
+Cola de trabajos en segundo plano con pool acotado de workers, claves de
+idempotencia y persistencia opcional en SQLite
+
+Configuración por variables de entorno:
+    JOB_WORKERS      Trabajos ejecutados en paralelo (por defecto 2)
+    JOB_QUEUE_SIZE   Trabajos en espera admitidos (por defecto 100)
+    JOB_RETENTION    Trabajos terminados conservados (por defecto 1000)
+    JOBS_DB_PATH     Archivo SQLite; si no se define los trabajos solo viven en memoria
+    JOB_EVENTS_MAX   Eventos de progreso conservados por trabajo (por defecto 500)
+    JOB_DRAIN_TIMEOUT Segundos de espera a los trabajos en curso al detenerse (por defecto 30)
+    JOB_POLL_INTERVAL Segundos entre consultas a la base por trabajos de otros procesos (por defecto 1)
+
+Con varios procesos compartiendo JOBS_DB_PATH, los trabajos pendientes de una
+ejecución anterior los recupera un solo proceso: el primero que los reclama con
+un boot id distinto (MCP_SERVER_BOOT_ID, común a los workers de un servidor).
+Cada trabajo lo ejecuta el proceso que lo recibió; los demás lo listan, siguen
+su estado y piden su cancelación a través de la base.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+import progress
+import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+DEFAULT_JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '100'))
+DEFAULT_JOB_RETENTION = int(os.getenv('JOB_RETENTION', '1000'))
+DEFAULT_JOB_EVENTS = int(os.getenv('JOB_EVENTS_MAX', '500'))
+DEFAULT_DRAIN_TIMEOUT = float(os.getenv('JOB_DRAIN_TIMEOUT', '30'))
+DEFAULT_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+
+
+class JobStatus(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: JobStatus = JobStatus.QUEUED
+    idempotency_key: Optional[str] = None
+    payload: Dict[str, Any]
+    payload_hash: str
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    def public(self) -> Dict[str, Any]:
+        """Representación para la API (sin el payload)"""
+        return self.model_dump(mode='json', exclude={'payload', 'payload_hash'})
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+class JobEvent(BaseModel):
+    """Evento de progreso de un trabajo; id es correlativo dentro del trabajo"""
+    id: int
+    event: str
+    data: Dict[str, Any]
+    elapsed_ms: float  # Desde que el trabajo empezó a ejecutarse
+
+
+class JobContext:
+    """Acceso del handler a su trabajo (progreso)"""
+
+    def __init__(self, manager: 'JobManager', job: Job):
+        self._manager = manager
+        self.job = job
+
+    def progress(self, **progress: Any) -> None:
+        self.job.progress = {**self.job.progress, **progress}
+
+    def emit(self, event: str, **data: Any) -> None:
+        self._manager.publish(self.job.id, event, data)
+
+
+JobHandler = Callable[[Dict[str, Any], JobContext], Awaitable[Dict[str, Any]]]
+
+
+class SqliteJobStore:
+    """Persistencia de trabajos en un archivo SQLite local"""
+
+    def __init__(self, path: str, boot_id: Optional[str] = None):
+        self.path = path
+        self.boot_id = boot_id or uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la conexión la primera vez que se usa (y tras close)"""
+        if self._connection is not None:
+            return self._connection
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            '''CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                created_at TEXT NOT NULL,
+                data TEXT NOT NULL,
+                boot_id TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0
+            )'''
+        )
+        columns = {row[1] for row in self._connection.execute('PRAGMA table_info(jobs)')}
+        for column, definition in (('boot_id', 'TEXT'), ('cancel_requested', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                self._connection.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+        self._connection.commit()
+        return self._connection
+
+    def insert(self, job: Job) -> Optional[Job]:
+        """Guarda un trabajo nuevo; si otro proceso ya registró su clave de idempotencia retorna ese trabajo"""
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.execute(
+                    'INSERT INTO jobs (id, kind, status, idempotency_key, created_at, data, boot_id) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job.id, job.kind, job.status.value, job.idempotency_key, job.created_at, job.model_dump_json(), self.boot_id)
+                )
+                connection.commit()
+                return None
+            except sqlite3.IntegrityError:
+                connection.rollback()
+                if job.idempotency_key is None:
+                    raise
+        existing = self.find_by_idempotency_key(job.idempotency_key)
+        if existing is None:
+            raise RuntimeError(f"No se pudo registrar el trabajo con la clave {job.idempotency_key}")
+        return existing
+
+    def save(self, job: Job) -> None:
+        """Actualiza el estado de un trabajo ya insertado"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'UPDATE jobs SET status = ?, data = ?, boot_id = ? WHERE id = ?',
+                (job.status.value, job.model_dump_json(), self.boot_id, job.id)
+            )
+            connection.commit()
+
+    def load(self, limit: int) -> List[Job]:
+        """Trabajos pendientes reclamados por este boot y los terminados más recientes
+
+        Los pendientes de ejecuciones anteriores se reclaman en una transacción
+        exclusiva, de modo que otro worker del mismo servidor no los repita.
+        """
+        pending = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                claimed = connection.execute(
+                    'SELECT data FROM jobs WHERE status IN (?, ?) AND (boot_id IS NULL OR boot_id != ?)',
+                    (*pending, self.boot_id)
+                ).fetchall()
+                connection.execute(
+                    'UPDATE jobs SET boot_id = ? WHERE status IN (?, ?) AND (boot_id IS NULL OR boot_id != ?)',
+                    (self.boot_id, *pending, self.boot_id)
+                )
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            finished = connection.execute(
+                'SELECT data FROM jobs WHERE status NOT IN (?, ?) ORDER BY created_at DESC LIMIT ?',
+                (*pending, limit)
+            ).fetchall()
+        jobs = [Job.model_validate_json(row[0]) for row in claimed + finished]
+        jobs.sort(key=lambda job: job.created_at)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._fetch_one('SELECT data FROM jobs WHERE id = ?', job_id)
+
+    def recent(self, status: Optional[JobStatus] = None, limit: int = 50) -> List[Job]:
+        """Trabajos de todos los procesos, más recientes primero"""
+        with self._lock:
+            connection = self._connect()
+            if status is None:
+                rows = connection.execute('SELECT data FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+            else:
+                rows = connection.execute(
+                    'SELECT data FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?',
+                    (status.value, limit)
+                ).fetchall()
+        return [Job.model_validate_json(row[0]) for row in rows]
+
+    def request_cancel(self, job_id: str) -> Optional[Job]:
+        """Marca un trabajo pendiente para que lo cancele el proceso que lo ejecuta"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)',
+                (job_id, JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+            )
+            connection.commit()
+        return self.get(job_id)
+
+    def cancel_requests(self) -> List[str]:
+        """Ids de trabajos pendientes con cancelación pedida"""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT id FROM jobs WHERE cancel_requested = 1 AND status IN (?, ?)',
+                (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def find_by_idempotency_key(self, idempotency_key: str) -> Optional[Job]:
+        return self._fetch_one('SELECT data FROM jobs WHERE idempotency_key = ?', idempotency_key)
+
+    def _fetch_one(self, query: str, value: str) -> Optional[Job]:
+        with self._lock:
+            row = self._connect().execute(query, (value,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def delete(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        with self._lock:
+            connection = self._connect()
+            connection.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in job_ids])
+            connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class JobManager:
+    """Recibe trabajos, los encola y los ejecuta con un número fijo de workers"""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_JOB_WORKERS,
+        max_queue: int = DEFAULT_JOB_QUEUE_SIZE,
+        retention: int = DEFAULT_JOB_RETENTION,
+        store: Optional[SqliteJobStore] = None,
+        max_events: int = DEFAULT_JOB_EVENTS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL
+    ):
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self.retention = retention
+        self.store = store
+        self.max_events = max_events
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._idempotency: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._watcher: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._events: Dict[str, Deque[JobEvent]] = {}
+        self._event_seq: Dict[str, int] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._started: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._draining = False
+        self._cancel_requested: set = set()
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Inicia los workers y recupera los trabajos persistidos"""
+        self._queue = asyncio.Queue()
+        self._draining = False
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+        if self.store is not None:
+            for job in await asyncio.to_thread(self.store.load, self.retention):
+                self._remember(job)
+                if job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                    # Un trabajo en curso al reiniciar se vuelve a ejecutar
+                    job.status = JobStatus.QUEUED
+                    job.started_at = None
+                    self._queue.put_nowait(job.id)
+            logger.info("Trabajos recuperados: %d en cola", self._queue.qsize())
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.store is not None:
+            self._watcher = asyncio.create_task(self._watch_cancel_requests())
+
+    async def stop(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """Deja de aceptar trabajos, espera los que están en curso y detiene los workers
+
+        Los trabajos que no terminan dentro de drain_timeout (y los que siguen en
+        cola) quedan como pendientes, para que los recupere el próximo arranque.
+        """
+        self._draining = True
+        running = list(self._running.values())
+        if running:
+            logger.info("Esperando %d trabajos en curso", len(running))
+            await asyncio.wait(running, timeout=drain_timeout)
+
+        tasks = self._workers + ([self._watcher] if self._watcher is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._watcher = None
+        if self.store is not None:
+            self.store.close()
+
+    async def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Job, bool]:
+        """Encola un trabajo; retorna (trabajo, creado)
+
+        Con la misma clave de idempotencia y el mismo payload retorna el trabajo
+        existente en lugar de crear otro.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        if self._draining:
+            raise JobQueueFull("El servidor se está deteniendo y no acepta trabajos")
+
+        payload_hash = hashlib.sha256(
+            json.dumps({'kind': kind, 'payload': payload}, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+
+        if idempotency_key is not None:
+            existing = self._jobs.get(self._idempotency.get(idempotency_key, ''))
+            if existing is None and self.store is not None:
+                # Puede haberlo recibido otro proceso que comparte la base
+                existing = await asyncio.to_thread(self.store.find_by_idempotency_key, idempotency_key)
+            if existing is not None:
+                if existing.payload_hash != payload_hash:
+                    raise IdempotencyConflict(f"La clave {idempotency_key} ya se usó con otro payload")
+                return existing, False
+
+        if self._queue.qsize() >= self.max_queue:
+            raise JobQueueFull(f"Cola de trabajos llena ({self.max_queue})")
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            idempotency_key=idempotency_key,
+            payload=payload,
+            payload_hash=payload_hash,
+            created_at=datetime.now().isoformat()
+        )
+        if self.store is not None:
+            # Otro proceso pudo recibir la misma clave entre la consulta y el insert
+            existing = await asyncio.to_thread(self.store.insert, job.model_copy(deep=True))
+            if existing is not None:
+                if existing.payload_hash != payload_hash:
+                    raise IdempotencyConflict(f"La clave {idempotency_key} ya se usó con otro payload")
+                return existing, False
+        self._remember(job)
+        self._queue.put_nowait(job.id)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def lookup(self, job_id: str) -> Optional[Job]:
+        """Como get, pero consulta la base si el trabajo no es de este proceso"""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = await asyncio.to_thread(self.store.get, job_id)
+        return job
+
+    async def list(self, status: Optional[JobStatus] = None, limit: int = 50) -> List[Job]:
+        """Trabajos más recientes primero (con base, también los de otros procesos)"""
+        jobs = [job for job in reversed(self._jobs.values()) if status is None or job.status == status]
+        if self.store is not None:
+            # Los de este proceso tienen el progreso más reciente
+            stored = await asyncio.to_thread(self.store.recent, status, limit)
+            local = {job.id: job for job in jobs}
+            jobs = [local.pop(job.id, job) for job in stored] + list(local.values())
+            jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return jobs[:limit]
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela el trabajo; si lo ejecuta otro proceso, pide la cancelación a través de la base"""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            return await asyncio.to_thread(self.store.request_cancel, job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+        else:
+            await self._finish(job, JobStatus.CANCELLED)
+        return job
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Registra un evento del trabajo y despierta a los suscriptores
+
+        Puede llamarse desde hilos del pool: el registro se hace siempre en el event loop.
+        """
+        if threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self.publish, job_id, event, data)
+            return
+
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+
+        seq = self._event_seq.get(job_id, 0) + 1
+        self._event_seq[job_id] = seq
+        started = self._started.get(job_id)
+        buffer = self._events.setdefault(job_id, deque(maxlen=self.max_events))
+        buffer.append(JobEvent(
+            id=seq,
+            event=event,
+            data=data,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 3) if started else 0.0
+        ))
+        # El último evento de cada tipo queda como progreso consultable por polling
+        if event != 'status':
+            job.progress = {**job.progress, event: data}
+        self._notify(job_id)
+
+    async def events(self, job_id: str, after: int = 0, heartbeat: float = 15.0) -> AsyncIterator[Optional[JobEvent]]:
+        """Eventos del trabajo posteriores a after; termina cuando el trabajo termina
+
+        Produce None cada heartbeat segundos sin eventos, para que el cliente
+        distinga un trabajo detenido de una conexión caída.
+        """
+        if job_id not in self._jobs and self.store is not None:
+            async for event in self._remote_events(job_id, after, heartbeat):
+                yield event
+            return
+
+        while True:
+            changed = self._changed.setdefault(job_id, asyncio.Event())
+            for event in list(self._events.get(job_id, ())):
+                if event.id > after:
+                    after = event.id
+                    yield event
+
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return
+
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    async def _remote_events(self, job_id: str, after: int, heartbeat: float) -> AsyncIterator[Optional[JobEvent]]:
+        """Eventos de un trabajo de otro proceso, consultando la base cada poll_interval
+
+        Solo se ven los cambios persistidos: el estado y el último progreso de
+        cada tipo de evento al momento de cada cambio de estado.
+        """
+        status = None
+        progress: Dict[str, Any] = {}
+        last_yield = time.monotonic()
+        while True:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None:
+                return
+
+            events = [(event, data) for event, data in job.progress.items() if progress.get(event) != data]
+            if job.status != status:
+                events.append(('status', {'status': job.status.value, 'error': job.error}))
+            progress, status = dict(job.progress), job.status
+            for event, data in events:
+                after += 1
+                last_yield = time.monotonic()
+                yield JobEvent(id=after, event=event, data=data, elapsed_ms=0.0)
+
+            if job.status in FINISHED_STATUSES:
+                return
+            if time.monotonic() - last_yield >= heartbeat:
+                last_yield = time.monotonic()
+                yield None
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.status.value] += 1
+        return {
+            'workers': self.workers,
+            'queue_size': self._queue.qsize() if self._queue else 0,
+            'max_queue': self.max_queue,
+            'persistent': self.store is not None,
+            'jobs': counts
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is None or job.status != JobStatus.QUEUED or self._draining:
+                    continue
+                task = asyncio.create_task(self._execute(job))
+                self._running[job.id] = task
+                try:
+                    await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    if not task.done():
+                        # Se detiene el worker: cancelar también el trabajo
+                        task.cancel()
+                        raise
+            finally:
+                if job is not None:
+                    self._running.pop(job.id, None)
+                self._queue.task_done()
+
+    async def _watch_cancel_requests(self) -> None:
+        """Cancela los trabajos de este proceso que otro proceso pidió cancelar"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not any(job.status not in FINISHED_STATUSES for job in self._jobs.values()):
+                continue
+            try:
+                job_ids = await asyncio.to_thread(self.store.cancel_requests)
+            except sqlite3.Error:
+                logger.exception("No se pudieron consultar las cancelaciones pedidas")
+                continue
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    await self.cancel(job_id)
+
+    async def _execute(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now().isoformat()
+        self._started[job.id] = time.perf_counter()
+        self.publish(job.id, 'status', {'status': job.status.value})
+        await self._persist(job)
+
+        try:
+            # Lo que el handler reporte con progress.report() llega a los eventos del trabajo
+            with progress.reporting_to(lambda event, data: self.publish(job.id, event, data)):
+                with tracing.span(f"job.{job.kind}", job_id=job.id):
+                    result = await self._handlers[job.kind](job.payload, JobContext(self, job))
+                    if isinstance(result, dict) and result.get('success') is False:
+                        tracing.fail(result.get('message') or 'success=False')
+        except asyncio.CancelledError:
+            if self._draining and job.id not in self._cancel_requested:
+                # Interrumpido por el apagado: vuelve a la cola persistida
+                job.status = JobStatus.QUEUED
+                job.started_at = None
+                job.progress = {}
+                self.publish(job.id, 'status', {'status': job.status.value})
+                await self._persist(job)
+            else:
+                await self._finish(job, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.exception("Trabajo %s (%s) falló", job.id, job.kind)
+            await self._finish(job, JobStatus.FAILED, error=str(e))
+        else:
+            # Los handlers que reportan success=False (p. ej. errores de generación) fallan el trabajo
+            if isinstance(result, dict) and result.get('success') is False:
+                await self._finish(job, JobStatus.FAILED, result=result, error=result.get('message'))
+            else:
+                await self._finish(job, JobStatus.SUCCEEDED, result=result)
+
+    async def _finish(
+        self,
+        job: Job,
+        status: JobStatus,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.now().isoformat()
+        self.publish(job.id, 'status', {'status': status.value, 'error': error})
+        self._started.pop(job.id, None)
+        self._cancel_requested.discard(job.id)
+        await self._persist(job)
+        await self._evict()
+
+    def _remember(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        if job.idempotency_key is not None:
+            self._idempotency[job.idempotency_key] = job.id
+
+    async def _evict(self) -> None:
+        """Descarta los trabajos terminados más antiguos por encima de la retención"""
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATUSES]
+        evicted = finished[:max(len(finished) - self.retention, 0)]
+        for job in evicted:
+            del self._jobs[job.id]
+            self._forget_events(job.id)
+            if job.idempotency_key is not None:
+                self._idempotency.pop(job.idempotency_key, None)
+        if evicted and self.store is not None:
+            await asyncio.to_thread(self.store.delete, [job.id for job in evicted])
+
+    def _notify(self, job_id: str) -> None:
+        changed = self._changed.pop(job_id, None)
+        if changed is not None:
+            changed.set()
+
+    def _forget_events(self, job_id: str) -> None:
+        self._events.pop(job_id, None)
+        self._event_seq.pop(job_id, None)
+        self._notify(job_id)
+
+    async def _persist(self, job: Job) -> None:
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, job.model_copy(deep=True))
+
+
+def create_job_manager() -> JobManager:
+    """JobManager configurado desde las variables de entorno"""
+    db_path = os.getenv('JOBS_DB_PATH')
+    store = SqliteJobStore(db_path, boot_id=os.getenv('MCP_SERVER_BOOT_ID')) if db_path else None
+    return JobManager(store=store)
@@ -0,0 +1,164 @@
+"""
+Pipeline de logging no bloqueante: cola acotada, escritor en segundo plano,
+formateo diferido, muestreo por nivel y salida JSON estructurada
+
+Configuración por variables de entorno:
+    LOG_LEVEL          Nivel mínimo (por defecto INFO)
+    LOG_FORMAT         'json' (por defecto) o 'text'
+    LOG_QUEUE_SIZE     Capacidad de la cola; al llenarse se descartan registros
+    LOG_SAMPLE_RATES   Fracción conservada por nivel para los loggers muestreados,
+                       ej: "DEBUG=0.01,INFO=0.1" (WARNING y superiores nunca se muestrean)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Loggers con mensajes por query y por archivo (sujetos a muestreo)
+SAMPLED_LOGGERS = ('sql_utils.query', 'crud_generator.files')
+
+DEFAULT_SAMPLE_RATES = {logging.DEBUG: 0.01, logging.INFO: 0.1}
+
+# Atributos estándar de LogRecord (el resto se considera "extra")
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class Lazy:
+    """Difiere el cálculo de un argumento de log hasta que el escritor lo formatea"""
+
+    __slots__ = ('_func', '_args')
+
+    def __init__(self, func: Callable[..., Any], *args: Any):
+        self._func = func
+        self._args = args
+
+    def __str__(self) -> str:
+        return str(self._func(*self._args))
+
+
+class SamplingFilter(logging.Filter):
+    """Conserva 1 de cada N registros de bajo nivel de los loggers muestreados"""
+
+    def __init__(self, rates: Dict[int, float], prefixes: Tuple[str, ...] = SAMPLED_LOGGERS):
+        super().__init__()
+        self.prefixes = prefixes
+        # Intervalo de muestreo por nivel (1 = conservar todo)
+        self.intervals = {level: max(int(round(1 / rate)), 1) if rate > 0 else 0 for level, rate in rates.items()}
+        self._counters: Dict[Tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        interval = self.intervals.get(record.levelno)
+        if interval is None or interval == 1 or not record.name.startswith(self.prefixes):
+            return True
+        if interval == 0:
+            return False
+
+        key = (record.name, record.levelno)
+        count = self._counters.get(key, 0)
+        self._counters[key] = count + 1
+        if count % interval:
+            return False
+        record.sample_rate = 1 / interval
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Encola el LogRecord sin formatearlo; el formateo ocurre en el escritor"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Nunca bloquear el request por logging
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, incluyendo los campos pasados en extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DeferredQueueHandler] = None
+
+
+def parse_sample_rates(value: Optional[str]) -> Dict[int, float]:
+    """Interpreta LOG_SAMPLE_RATES ("DEBUG=0.01,INFO=0.1")"""
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    if not value:
+        return rates
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        level_name, rate = item.split('=', 1)
+        level = logging.getLevelName(level_name.strip().upper())
+        if isinstance(level, int):
+            rates[level] = float(rate)
+    return rates
+
+
+def setup_logging() -> None:
+    """Instala el pipeline en el logger raíz (idempotente)"""
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+        stream_handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(parse_sample_rates(os.getenv('LOG_SAMPLE_RATES'))))
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Vacía la cola y detiene el escritor"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
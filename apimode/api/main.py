@@ -1,15 +1,61 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response, Header, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+import anyio.to_thread
+from pydantic import BaseModel, ValidationError as PydanticValidationError
+from typing import Dict, Any, Optional, List, Tuple, TYPE_CHECKING
+from functools import lru_cache
 import os
 import json
+import time
+import logging
 from pathlib import Path
-from crud_generator import CRUDGenerator
-from model_types import CRUDGeneratorConfig, GeneratorOptions
+from log_pipeline import setup_logging, dropped_records
+from model_types import CRUDGeneratorConfig, GeneratorOptions, CRUDGeneratorError, BatchValidationResult
 from validators import CRUDValidator
 from sql_utils import SqlValidator, SqlConnection
+from query_stats import query_stats
+from metrics import REGISTRY, SQL_PHASE_SECONDS, Gauge, EventLoopLagMonitor
+from middleware import MetricsMiddleware, TracingMiddleware, ProfilingMiddleware
+from profiling import PROFILING_TOKEN, profile_store, token_matches
+from memory import memory_diagnostics, process_memory
+import tracing
+from static_responses import PrecomputedResponse
+from jobs import JobContext, JobStatus, JobQueueFull, IdempotencyConflict, create_job_manager
 
-app = FastAPI(title="MCP Creator API", version="1.0.0")
+if TYPE_CHECKING:
+    from crud_generator import CRUDGenerator
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+loop_lag_monitor = EventLoopLagMonitor()
+job_manager = create_job_manager()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_lag_monitor.start()
+    if os.getenv('WARM_UP', '0') == '1':
+        # Cargar el generador y compilar templates antes de recibir tráfico
+        warm_up = await get_generator().warm_up(start_process_pool=os.getenv('WARM_BATCH_PROCESSES', '0') == '1')
+        logger.info("Templates precompilados: %s", warm_up)
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    await loop_lag_monitor.stop()
+    if _generator is not None:
+        _generator.shutdown()
+
+# Rutas de monitoreo y streams largos: no aportan a las trazas
+TRACE_EXCLUDED_ROUTES = ('/health', '/metrics', '/traces', '/traces/{trace_id}', '/jobs/{job_id}/events')
+
+app = FastAPI(title="MCP Creator API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware, exclude=TRACE_EXCLUDED_ROUTES)
+if PROFILING_TOKEN:
+    # Sin token no se instala: las peticiones no pagan ningún costo
+    app.add_middleware(ProfilingMiddleware, token=PROFILING_TOKEN)
 
 class GenerateRequest(BaseModel):
     entity_name: str
@@ -26,10 +72,46 @@ class GenerateResponse(BaseModel):
     message: str
     generated_files: list[str] = []
     errors: Optional[list[str]] = None
+    changes: Optional[Dict[str, int]] = None
+
+class GenerateArchiveRequest(GenerateRequest):
+    archive_format: str = "zip"  # zip | tar
+    compress: bool = True  # zip: deflate, tar: gzip
+
+class BatchGenerateRequest(BaseModel):
+    entities: List[GenerateRequest]
+    options: Optional[Dict[str, Any]] = None  # Se aplican a todas las entidades
+    process_threshold: Optional[int] = None  # Tamaño mínimo del lote para renderizar en procesos
+
+class BatchEntityResult(BaseModel):
+    entity_name: str
+    success: bool
+    message: str
+    generated_files: list[str] = []
+    errors: Optional[list[str]] = None
+    changes: Optional[Dict[str, int]] = None
+
+class BatchGenerateResponse(BaseModel):
+    success: bool
+    message: str
+    mode: str
+    results: List[BatchEntityResult] = []
+    errors: Optional[list[str]] = None
+    total_files: int = 0
+    timings: Dict[str, float] = {}
+
+class RestoreSnapshotRequest(BaseModel):
+    target_path: Optional[str] = None  # Por defecto el directorio original
+    files: Optional[List[str]] = None  # Rutas relativas; por defecto todas
 
 class ValidateRequest(BaseModel):
     config: Dict[str, Any]
 
+class ValidateBatchRequest(BaseModel):
+    configs: List[Dict[str, Any]] = []
+    fields: List[Dict[str, Any]] = []  # Campos sueltos (validación estructural)
+    allow_external_relations: bool = False  # Relaciones a entidades fuera del lote como advertencia
+
 class ValidationError(BaseModel):
     field: str
     message: str
@@ -56,64 +138,517 @@ class FieldType(BaseModel):
 class FieldTypesResponse(BaseModel):
     field_types: List[FieldType]
 
-# Inicializar generador
+# Generador (Jinja, manifiesto de templates, pools) creado en el primer uso:
+# un worker que solo atiende SQL no lo carga nunca
 current_dir = Path(__file__).parent
 templates_path = current_dir / "templates" / "crud"
-generator = CRUDGenerator(str(templates_path))
+_generator: Optional['CRUDGenerator'] = None
+
+def get_generator() -> 'CRUDGenerator':
+    global _generator
+    if _generator is None:
+        from crud_generator import CRUDGenerator
+        _generator = CRUDGenerator(str(templates_path))
+    return _generator
+
+def _generation_cache_stats() -> Dict[str, Any]:
+    """Estadísticas del cache de resultados (vacías si el generador aún no se creó)"""
+    if _generator is None:
+        return {'entries': 0, 'bytes': 0, 'hit_ratio': 0.0}
+    return _generator.result_cache.stats()
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "message": "API is running"}
 
+# Métricas calculadas al exportar (pools y caches)
+def _threadpool_stats() -> Dict[tuple, float]:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        ('borrowed',): limiter.borrowed_tokens,
+        ('total',): limiter.total_tokens,
+        ('waiting',): limiter.statistics().tasks_waiting
+    }
+
+Gauge(
+    'mcp_threadpool_tokens',
+    'Uso del threadpool de trabajo bloqueante (SQL)',
+    label_names=('state',),
+    callback=_threadpool_stats
+)
+Gauge(
+    'mcp_cache_entries',
+    'Entradas en caches en memoria',
+    label_names=('cache',),
+    callback=lambda: {
+        ('sql_fingerprints',): query_stats.summary()['fingerprints'],
+        ('compiled_templates',): _generator.cache_stats()['compiled_templates'] if _generator else 0,
+        ('generation_results',): _generation_cache_stats()['entries']
+    }
+)
+Gauge(
+    'mcp_generation_cache_bytes',
+    'Bytes únicos retenidos por el cache de resultados de generación',
+    callback=lambda: _generation_cache_stats()['bytes']
+)
+Gauge(
+    'mcp_generation_cache_hit_ratio',
+    'Proporción de aciertos del cache de resultados de generación',
+    callback=lambda: _generation_cache_stats()['hit_ratio']
+)
+Gauge(
+    'mcp_log_records_dropped',
+    'Registros de log descartados por cola llena',
+    callback=dropped_records
+)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas del proceso en formato de texto Prometheus"""
+    return Response(
+        content=REGISTRY.render_prometheus(),
+        media_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+def _build_generator_config(request: GenerateRequest) -> CRUDGeneratorConfig:
+    """Completa los valores por defecto de un request y construye la configuración"""
+    entity_name_plural = request.entity_name_plural or f"{request.entity_name}s"
+    api_endpoint = request.api_endpoint or f"/api/{request.entity_name.lower()}s"
+    output_path = request.output_path or f"./generated/{request.entity_name.lower()}"
+    
+    permissions = request.permissions or {
+        "create": True,
+        "read": True,
+        "update": True,
+        "delete": True
+    }
+    
+    config_data = {
+        "targetPath": output_path,
+        "entityName": request.entity_name,
+        "entityNamePlural": entity_name_plural,
+        "fields": request.fields,
+        "apiEndpoint": api_endpoint,
+        "permissions": permissions
+    }
+    
+    return CRUDGeneratorConfig.model_validate(config_data)
+
+async def _run_generate(request: GenerateRequest) -> GenerateResponse:
+    # Verificar que los templates existen
+    templates_valid = await get_generator().validate_templates_path()
+    if not templates_valid:
+        raise HTTPException(
+            status_code=500, 
+            detail="Templates not found or invalid"
+        )
+    
+    # Construir configuración completa
+    config = _build_generator_config(request)
+    
+    # Opciones de generación
+    options_data = request.options or {}
+    options = GeneratorOptions.model_validate(options_data)
+    
+    # Generar CRUD
+    result = await get_generator().generate(config, options)
+    
+    return GenerateResponse(
+        success=result.success,
+        message=result.message,
+        generated_files=result.files_created,
+        errors=result.errors,
+        changes=result.changes
+    )
+
+async def _run_generate_batch(request: BatchGenerateRequest) -> BatchGenerateResponse:
+    from crud_generator import DEFAULT_BATCH_PROCESS_THRESHOLD
+    
+    if not request.entities:
+        raise HTTPException(status_code=400, detail="El lote no contiene entidades")
+    
+    templates_valid = await get_generator().validate_templates_path()
+    if not templates_valid:
+        raise HTTPException(
+            status_code=500, 
+            detail="Templates not found or invalid"
+        )
+    
+    # Una entidad con configuración inválida falla sola (con sus errores), sin un 500 para todo el lote
+    configs = []
+    invalid: Dict[int, List[str]] = {}
+    for index, entity in enumerate(request.entities):
+        try:
+            configs.append(_build_generator_config(entity))
+        except PydanticValidationError as e:
+            invalid[index] = [f"{'.'.join(str(x) for x in error['loc'])}: {error['msg']}" for error in e.errors()]
+    if invalid:
+        return _invalid_batch_response(request, invalid)
+    
+    options = GeneratorOptions.model_validate(request.options or {})
+    
+    started = time.perf_counter()
+    result = await get_generator().generate_batch(
+        configs,
+        options,
+        process_threshold=request.process_threshold or DEFAULT_BATCH_PROCESS_THRESHOLD
+    )
+    
+    return BatchGenerateResponse(
+        success=result.success,
+        message=result.message,
+        mode=result.mode,
+        results=[
+            BatchEntityResult(
+                entity_name=entity.entity_name,
+                success=entity.success,
+                message=entity.message,
+                generated_files=entity.files_created,
+                errors=entity.errors,
+                changes=entity.changes
+            ) for entity in result.results
+        ],
+        errors=result.errors,
+        total_files=sum(len(entity.files_created) for entity in result.results),
+        timings={**result.timings, 'total': round((time.perf_counter() - started) * 1000, 3)}
+    )
+
+def _invalid_batch_response(request: BatchGenerateRequest, invalid: Dict[int, List[str]]) -> BatchGenerateResponse:
+    """Lote rechazado antes de generar: como en generate_batch, no se escribe ninguna entidad"""
+    from crud_generator import DEFAULT_BATCH_PROCESS_THRESHOLD
+    
+    threshold = request.process_threshold or DEFAULT_BATCH_PROCESS_THRESHOLD
+    results = [
+        BatchEntityResult(
+            entity_name=entity.entity_name,
+            success=False,
+            message='Configuración inválida' if index in invalid else 'No generado: el lote contiene configuraciones inválidas',
+            errors=invalid.get(index)
+        ) for index, entity in enumerate(request.entities)
+    ]
+    return BatchGenerateResponse(
+        success=False,
+        message=f"Lote inválido: {len(invalid)} de {len(request.entities)} configuraciones con errores",
+        mode='process' if len(request.entities) >= max(threshold, 1) else 'thread',
+        results=results,
+        errors=[
+            f"{request.entities[index].entity_name}: {error}"
+            for index, errors in invalid.items()
+            for error in errors
+        ]
+    )
+
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_templates(request: GenerateRequest):
     try:
-        # Verificar que los templates existen
-        templates_valid = await generator.validate_templates_path()
-        if not templates_valid:
-            raise HTTPException(
-                status_code=500, 
-                detail="Templates not found or invalid"
-            )
-        
-        # Construir configuración completa
-        entity_name_plural = request.entity_name_plural or f"{request.entity_name}s"
-        api_endpoint = request.api_endpoint or f"/api/{request.entity_name.lower()}s"
-        output_path = request.output_path or f"./generated/{request.entity_name.lower()}"
-        
-        permissions = request.permissions or {
-            "create": True,
-            "read": True,
-            "update": True,
-            "delete": True
-        }
-        
-        config_data = {
-            "targetPath": output_path,
-            "entityName": request.entity_name,
-            "entityNamePlural": entity_name_plural,
-            "fields": request.fields,
-            "apiEndpoint": api_endpoint,
-            "permissions": permissions
-        }
-        
-        config = CRUDGeneratorConfig.model_validate(config_data)
-        
-        # Opciones de generación
-        options_data = request.options or {}
-        options = GeneratorOptions.model_validate(options_data)
-        
-        # Generar CRUD
-        result = await generator.generate(config, options)
-        
-        return GenerateResponse(
-            success=result.success,
-            message=result.message,
-            generated_files=result.files_created,
-            errors=result.errors
+        return await _run_generate(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/generate/archive")
+async def generate_archive(request: GenerateArchiveRequest):
+    """Renderiza el módulo en memoria y lo retorna como zip/tar (sin escribir en disco)"""
+    from archive import archive_info, iter_archive
+    
+    try:
+        filename, media_type = archive_info(request.entity_name.lower(), request.archive_format, request.compress)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        config = _build_generator_config(request)
+        options = GeneratorOptions.model_validate(request.options or {})
+        files = await get_generator().render_module(config, options)
+    except CRUDGeneratorError as e:
+        raise HTTPException(
+            status_code=400 if e.code == 'INVALID_CONFIG' else 500,
+            detail={'message': str(e), 'code': e.code, 'errors': e.details}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return StreamingResponse(
+        iter_archive(files, request.archive_format, request.compress, root=request.entity_name.lower()),
+        media_type=media_type,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Generated-Files': str(len(files))
+        }
+    )
+
+@app.post("/generate/batch", response_model=BatchGenerateResponse)
+async def generate_batch(request: BatchGenerateRequest):
+    try:
+        return await _run_generate_batch(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Trabajos en segundo plano
+async def _generate_job(payload: Dict[str, Any], job: JobContext) -> Dict[str, Any]:
+    try:
+        response = await _run_generate(GenerateRequest.model_validate(payload))
+    except HTTPException as e:
+        raise RuntimeError(e.detail)
+    return response.model_dump()
+
+async def _generate_batch_job(payload: Dict[str, Any], job: JobContext) -> Dict[str, Any]:
+    try:
+        response = await _run_generate_batch(BatchGenerateRequest.model_validate(payload))
+    except HTTPException as e:
+        raise RuntimeError(e.detail)
+    return response.model_dump()
+
+job_manager.register('generate', _generate_job)
+job_manager.register('generate_batch', _generate_batch_job)
+
+async def _submit_job(kind: str, payload: Dict[str, Any], idempotency_key: Optional[str], response: Response) -> Dict[str, Any]:
+    try:
+        job, created = await job_manager.submit(kind, payload, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    response.status_code = 202 if created else 200
+    return job.public()
+
+@app.post("/jobs/generate")
+async def submit_generate_job(
+    request: GenerateRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    """Encola una generación y retorna el trabajo de inmediato"""
+    return await _submit_job('generate', request.model_dump(), idempotency_key, response)
+
+@app.post("/jobs/generate/batch")
+async def submit_generate_batch_job(
+    request: BatchGenerateRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    return await _submit_job('generate_batch', request.model_dump(), idempotency_key, response)
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[JobStatus] = None, limit: int = 50):
+    return {
+        'jobs': [job.public() for job in await job_manager.list(status, limit)],
+        'stats': job_manager.stats()
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_manager.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    return job.public()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, last_event_id: Optional[int] = Header(default=None)):
+    """Eventos de progreso del trabajo como Server-Sent Events
+    
+    Envía los eventos ya registrados (o los posteriores a Last-Event-ID al
+    reconectar) y sigue transmitiendo hasta que el trabajo termina.
+    """
+    if await job_manager.lookup(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    
+    async def stream():
+        async for event in job_manager.events(job_id, after=last_event_id or 0):
+            if event is None:
+                yield b": keep-alive\n\n"
+                continue
+            data = json.dumps({**event.data, 'elapsed_ms': event.elapsed_ms}, default=str)
+            yield f"id: {event.id}\nevent: {event.event}\ndata: {data}\n\n".encode('utf-8')
+    
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    return job.public()
+
+@app.get("/generate/cache")
+async def get_generation_cache():
+    """Estado del cache de resultados de generación"""
+    return get_generator().result_cache.stats()
+
+@app.delete("/generate/cache")
+async def clear_generation_cache():
+    get_generator().result_cache.clear()
+    return {"success": True, "message": "Cache de resultados vaciado"}
+
+@app.get("/snapshots")
+async def list_snapshots(target_path: Optional[str] = None):
+    """Snapshots de archivos sobrescritos (más recientes primero)"""
+    snapshots = await run_in_threadpool(get_generator().snapshots.list, target_path)
+    return {
+        'snapshots': [
+            {
+                'id': info.id,
+                'target_path': info.target_path,
+                'created_at': info.created_at,
+                'files': sorted(info.files),
+                'size': info.size
+            } for info in snapshots
+        ],
+        'stats': await run_in_threadpool(get_generator().snapshots.stats)
+    }
+
+@app.post("/snapshots/{snapshot_id}/restore")
+async def restore_snapshot(snapshot_id: str, request: RestoreSnapshotRequest):
+    try:
+        restored = await get_generator().snapshots.restore(snapshot_id, request.target_path, request.files)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {"success": True, "restored_files": restored}
+
+@app.post("/snapshots/prune")
+async def prune_snapshots(target_path: Optional[str] = None):
+    return await run_in_threadpool(get_generator().snapshots.prune, target_path)
+
+def _require_profiling_token(token: Optional[str]) -> None:
+    """Perfiles, trazas y diagnóstico de memoria requieren X-Profile: <PROFILING_TOKEN>"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Diagnóstico deshabilitado (PROFILING_TOKEN no definido)")
+    if not token_matches(token):
+        raise HTTPException(status_code=403, detail="Token de perfilado inválido")
+
+@app.get("/profiles")
+async def list_profiles(x_profile: Optional[str] = Header(default=None)):
+    """Perfiles de peticiones guardados (más recientes primero)"""
+    _require_profiling_token(x_profile)
+    profiles = await run_in_threadpool(profile_store.list)
+    return {'profiles': [info.model_dump() for info in profiles]}
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_profile: Optional[str] = Header(default=None)):
+    """Pilas del perfil en formato collapsed (flamegraph.pl, speedscope, inferno)"""
+    _require_profiling_token(x_profile)
+    try:
+        collapsed = await run_in_threadpool(profile_store.read, profile_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return Response(
+        content=collapsed,
+        media_type='text/plain; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{profile_id}.collapsed"'}
+    )
+
+def _memory_caches() -> Dict[str, Any]:
+    """Tamaño de los caches y pools que retienen memoria en el proceso"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        'generator': _generator.cache_stats() if _generator is not None else {'loaded': False},
+        'example_configs': _example_config_response.cache_info()._asdict(),
+        'sql_stats': query_stats.summary(),
+        'jobs': job_manager.stats(),
+        'traces': tracing.tracer.stats(),
+        'threadpool': {'borrowed': limiter.borrowed_tokens, 'total': limiter.total_tokens}
+    }
+
+@app.get("/memory")
+async def get_memory(x_profile: Optional[str] = Header(default=None)):
+    """RSS del proceso, estado de tracemalloc y tamaño de los caches"""
+    _require_profiling_token(x_profile)
+    return {
+        'process': await run_in_threadpool(process_memory),
+        'tracemalloc': memory_diagnostics.status(),
+        'caches': _memory_caches()
+    }
+
+@app.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: Optional[int] = None, x_profile: Optional[str] = Header(default=None)):
+    """Activa tracemalloc (frames > 1 agrupa por traceback, con más costo)"""
+    _require_profiling_token(x_profile)
+    return memory_diagnostics.start(frames)
+
+@app.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc(x_profile: Optional[str] = Header(default=None)):
+    _require_profiling_token(x_profile)
+    return memory_diagnostics.stop()
+
+@app.post("/memory/snapshots")
+async def take_memory_snapshot(label: Optional[str] = None, x_profile: Optional[str] = Header(default=None)):
+    _require_profiling_token(x_profile)
+    try:
+        return await run_in_threadpool(memory_diagnostics.take_snapshot, label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/memory/snapshots/{snapshot_id}")
+async def get_memory_snapshot(
+    snapshot_id: str,
+    key_type: str = 'lineno',
+    limit: int = 25,
+    x_profile: Optional[str] = Header(default=None)
+):
+    """Sitios de asignación con más memoria en la snapshot"""
+    _require_profiling_token(x_profile)
+    try:
+        return await run_in_threadpool(memory_diagnostics.top, snapshot_id, key_type, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/memory/snapshots")
+async def clear_memory_snapshots(x_profile: Optional[str] = Header(default=None)):
+    _require_profiling_token(x_profile)
+    return {'deleted': memory_diagnostics.clear()}
+
+@app.get("/memory/diff")
+async def diff_memory_snapshots(
+    base: str,
+    target: Optional[str] = None,
+    key_type: str = 'lineno',
+    limit: int = 25,
+    x_profile: Optional[str] = Header(default=None)
+):
+    """Crecimiento por sitio de asignación entre dos snapshots (sin target, hasta ahora)"""
+    _require_profiling_token(x_profile)
+    try:
+        return await run_in_threadpool(memory_diagnostics.diff, base, target, key_type, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/traces")
+async def list_traces(
+    min_ms: float = 0,
+    name: Optional[str] = None,
+    limit: int = 50,
+    x_profile: Optional[str] = Header(default=None)
+):
+    """Trazas terminadas más recientes, opcionalmente solo las lentas (min_ms) o por nombre"""
+    _require_profiling_token(x_profile)
+    return {
+        'traces': tracing.tracer.traces(min_ms=min_ms, name=name, limit=limit),
+        'stats': tracing.tracer.stats()
+    }
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, x_profile: Optional[str] = Header(default=None)):
+    """Spans de la traza en formato OTLP JSON"""
+    _require_profiling_token(x_profile)
+    try:
+        return tracing.tracer.get(trace_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
 
 @app.post("/validate", response_model=ValidateResponse)
 async def validate_config(request: ValidateRequest):
@@ -134,121 +669,144 @@ async def validate_config(request: ValidateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/validate/batch", response_model=BatchValidationResult)
+async def validate_batch(request: ValidateBatchRequest):
+    """Valida muchas configuraciones y campos en una llamada, incluyendo chequeos entre entidades"""
+    if not request.configs and not request.fields:
+        raise HTTPException(status_code=400, detail="El lote no contiene configuraciones ni campos")
+    
+    return CRUDValidator.validate_batch(request.configs, request.fields, request.allow_external_relations)
+
+def _build_field_types_response() -> FieldTypesResponse:
+    field_types = [
+        FieldType(
+            type='text',
+            description='Texto simple',
+            validation=['min', 'max', 'pattern'],
+            example={'name': 'nombre', 'type': 'text', 'label': 'Nombre', 'required': True}
+        ),
+        FieldType(
+            type='email',
+            description='Dirección de correo electrónico',
+            validation=['pattern (automático)'],
+            example={'name': 'email', 'type': 'email', 'label': 'Email', 'required': True}
+        ),
+        FieldType(
+            type='password',
+            description='Contraseña (oculta al escribir)',
+            validation=['min', 'max', 'pattern'],
+            example={'name': 'password', 'type': 'password', 'label': 'Contraseña', 'required': True}
+        ),
+        FieldType(
+            type='number',
+            description='Número entero o decimal',
+            validation=['min', 'max'],
+            example={'name': 'precio', 'type': 'number', 'label': 'Precio', 'required': True}
+        ),
+        FieldType(
+            type='textarea',
+            description='Texto largo (múltiples líneas)',
+            validation=['min', 'max'],
+            example={'name': 'descripcion', 'type': 'textarea', 'label': 'Descripción', 'required': False}
+        ),
+        FieldType(
+            type='select',
+            description='Lista desplegable de opciones',
+            validation=['options (requerido)'],
+            example={
+                'name': 'estado',
+                'type': 'select',
+                'label': 'Estado',
+                'required': True,
+                'validation': {'options': ['activo', 'inactivo']}
+            }
+        ),
+        FieldType(
+            type='boolean',
+            description='Verdadero/Falso (checkbox)',
+            validation=[],
+            example={'name': 'activo', 'type': 'boolean', 'label': 'Activo', 'required': True}
+        ),
+        FieldType(
+            type='date',
+            description='Fecha (selector de calendario)',
+            validation=[],
+            example={'name': 'fechaCreacion', 'type': 'date', 'label': 'Fecha de Creación', 'required': True}
+        ),
+        FieldType(
+            type='file',
+            description='Archivo (upload)',
+            validation=['accept (tipos MIME)'],
+            example={
+                'name': 'imagen',
+                'type': 'file',
+                'label': 'Imagen',
+                'required': False,
+                'validation': {'accept': 'image/*'}
+            }
+        ),
+        FieldType(
+            type='relation',
+            description='Relación con otra entidad',
+            validation=['relation (configuración completa requerida)'],
+            example={
+                'name': 'categoria',
+                'type': 'relation',
+                'label': 'Categoría',
+                'required': True,
+                'relation': {
+                    'endpoint': '/api/categorias/search',
+                    'displayField': 'nombre',
+                    'valueField': 'id',
+                    'searchFields': ['nombre'],
+                    'multiple': False,
+                    'preload': False,
+                    'minChars': 2,
+                    'relationEntity': 'Categoria',
+                    'allowCreate': False
+                }
+            }
+        )
+    ]
+    
+    return FieldTypesResponse(field_types=field_types)
+
+# Contenido fijo durante la vida del proceso: se serializa una sola vez
+FIELD_TYPES_RESPONSE = PrecomputedResponse(_build_field_types_response())
+
 @app.get("/field-types", response_model=FieldTypesResponse)
-async def get_field_types():
+async def get_field_types(http_request: Request):
+    return FIELD_TYPES_RESPONSE.respond(http_request)
+
+@lru_cache(maxsize=256)
+def _example_config_response(entity_name: str, complexity: str) -> PrecomputedResponse:
+    """Ejemplo ya serializado por (entidad, complejidad)"""
+    if complexity == "simple":
+        config = generate_simple_example(entity_name)
+    elif complexity == "complex":
+        config = generate_complex_example(entity_name)
+    else:  # medium
+        config = generate_medium_example(entity_name)
+    
+    return PrecomputedResponse(ExampleConfigResponse(config=config))
+
+def _example_config(entity_name: str, complexity: str, http_request: Request) -> Response:
+    # Complejidades desconocidas usan el ejemplo medium (y comparten su entrada de cache)
+    if complexity not in ("simple", "complex"):
+        complexity = "medium"
     try:
-        field_types = [
-            FieldType(
-                type='text',
-                description='Texto simple',
-                validation=['min', 'max', 'pattern'],
-                example={'name': 'nombre', 'type': 'text', 'label': 'Nombre', 'required': True}
-            ),
-            FieldType(
-                type='email',
-                description='Dirección de correo electrónico',
-                validation=['pattern (automático)'],
-                example={'name': 'email', 'type': 'email', 'label': 'Email', 'required': True}
-            ),
-            FieldType(
-                type='password',
-                description='Contraseña (oculta al escribir)',
-                validation=['min', 'max', 'pattern'],
-                example={'name': 'password', 'type': 'password', 'label': 'Contraseña', 'required': True}
-            ),
-            FieldType(
-                type='number',
-                description='Número entero o decimal',
-                validation=['min', 'max'],
-                example={'name': 'precio', 'type': 'number', 'label': 'Precio', 'required': True}
-            ),
-            FieldType(
-                type='textarea',
-                description='Texto largo (múltiples líneas)',
-                validation=['min', 'max'],
-                example={'name': 'descripcion', 'type': 'textarea', 'label': 'Descripción', 'required': False}
-            ),
-            FieldType(
-                type='select',
-                description='Lista desplegable de opciones',
-                validation=['options (requerido)'],
-                example={
-                    'name': 'estado',
-                    'type': 'select',
-                    'label': 'Estado',
-                    'required': True,
-                    'validation': {'options': ['activo', 'inactivo']}
-                }
-            ),
-            FieldType(
-                type='boolean',
-                description='Verdadero/Falso (checkbox)',
-                validation=[],
-                example={'name': 'activo', 'type': 'boolean', 'label': 'Activo', 'required': True}
-            ),
-            FieldType(
-                type='date',
-                description='Fecha (selector de calendario)',
-                validation=[],
-                example={'name': 'fechaCreacion', 'type': 'date', 'label': 'Fecha de Creación', 'required': True}
-            ),
-            FieldType(
-                type='file',
-                description='Archivo (upload)',
-                validation=['accept (tipos MIME)'],
-                example={
-                    'name': 'imagen',
-                    'type': 'file',
-                    'label': 'Imagen',
-                    'required': False,
-                    'validation': {'accept': 'image/*'}
-                }
-            ),
-            FieldType(
-                type='relation',
-                description='Relación con otra entidad',
-                validation=['relation (configuración completa requerida)'],
-                example={
-                    'name': 'categoria',
-                    'type': 'relation',
-                    'label': 'Categoría',
-                    'required': True,
-                    'relation': {
-                        'endpoint': '/api/categorias/search',
-                        'displayField': 'nombre',
-                        'valueField': 'id',
-                        'searchFields': ['nombre'],
-                        'multiple': False,
-                        'preload': False,
-                        'minChars': 2,
-                        'relationEntity': 'Categoria',
-                        'allowCreate': False
-                    }
-                }
-            )
-        ]
-        
-        return FieldTypesResponse(field_types=field_types)
+        return _example_config_response(entity_name, complexity).respond(http_request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/example-config", response_model=ExampleConfigResponse)
-async def generate_example_config(request: ExampleConfigRequest):
-    try:
-        entity_name = request.entity_name
-        complexity = request.complexity
-        
-        # Generar configuración según complejidad
-        if complexity == "simple":
-            config = generate_simple_example(entity_name)
-        elif complexity == "complex":
-            config = generate_complex_example(entity_name)
-        else:  # medium
-            config = generate_medium_example(entity_name)
-            
-        return ExampleConfigResponse(config=config)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def generate_example_config(request: ExampleConfigRequest, http_request: Request):
+    return _example_config(request.entity_name, request.complexity, http_request)
+
+@app.get("/example-config", response_model=ExampleConfigResponse)
+async def get_example_config(entity_name: str, http_request: Request, complexity: str = "medium"):
+    """Variante GET cacheable (ETag / If-None-Match) de /example-config"""
+    return _example_config(entity_name, complexity, http_request)
 
 def generate_simple_example(entity_name: str) -> Dict[str, Any]:
     name = entity_name.lower()
@@ -501,6 +1059,10 @@ class ExecuteSqlRequest(BaseModel):
     connection_string: str
     query: str
     max_rows: int = 1000
+    analyze: bool = False  # Capturar plan estimado y estadísticas IO/TIME
+    max_estimated_cost: Optional[float] = None  # Rechazar si el costo estimado lo excede
+    max_estimated_rows: Optional[float] = None  # Rechazar si las filas estimadas lo exceden
+    include_timings: bool = False  # Incluir el desglose de tiempos por fase
 
 class ExecuteSqlResponse(BaseModel):
     success: bool
@@ -511,6 +1073,8 @@ class ExecuteSqlResponse(BaseModel):
     columns: List[str] = []
     errors: Optional[List[str]] = None
     warnings: Optional[List[str]] = None
+    plan: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, float]] = None  # ms por fase (pool_wait, connect, execute, fetch, serialize...)
 
 class DatabaseInfoRequest(BaseModel):
     connection_string: str
@@ -522,57 +1086,154 @@ class DatabaseInfoResponse(BaseModel):
     data: Dict[str, Any]
     message: Optional[str] = None
 
-@app.post("/execute-sql", response_model=ExecuteSqlResponse)
-async def execute_sql(request: ExecuteSqlRequest):
-    try:
-        # Validar la query
-        validation = SqlValidator.validate(request.query)
-        
-        if not validation['is_valid']:
-            return ExecuteSqlResponse(
-                success=False,
-                query_type=validation['query_type'],
-                errors=validation['errors'],
-                warnings=validation['warnings']
-            )
-        
-        # Sanitizar query
-        clean_query = SqlValidator.sanitize_query(request.query)
-        
-        # Ejecutar query
-        import time
-        start_time = time.time()
-        
+async def _run_execute_sql(request: ExecuteSqlRequest) -> Tuple[ExecuteSqlResponse, Optional[Dict[str, float]]]:
+    """Valida y ejecuta la query; retorna la respuesta y los tiempos por fase (None si no se ejecutó)"""
+    # Validar la query
+    validation = SqlValidator.validate(request.query)
+    
+    if not validation['is_valid']:
+        return ExecuteSqlResponse(
+            success=False,
+            query_type=validation['query_type'],
+            errors=validation['errors'],
+            warnings=validation['warnings']
+        ), None
+    
+    # Sanitizar query
+    clean_query = SqlValidator.sanitize_query(request.query)
+    
+    # Ejecutar query en el threadpool para no bloquear el event loop
+    submitted_at = time.perf_counter()
+    
+    def run_query() -> Dict[str, Any]:
+        pool_wait_ms = (time.perf_counter() - submitted_at) * 1000
         result = SqlConnection.execute_query(
             request.connection_string,
             clean_query,
-            request.max_rows
+            request.max_rows,
+            analyze=request.analyze,
+            max_estimated_cost=request.max_estimated_cost,
+            max_estimated_rows=request.max_estimated_rows
         )
+        result['timings'] = {'pool_wait': round(pool_wait_ms, 3), **result.get('timings', {})}
+        return result
+    
+    with tracing.span('sql.query', query_type=validation['query_type'], max_rows=request.max_rows):
+        result = await run_in_threadpool(run_query)
         
-        execution_time = int((time.time() - start_time) * 1000)
+        timings = result['timings']
+        elapsed_ms = sum(ms for phase, ms in timings.items() if phase != 'pool_wait')
+        execution_time = int(elapsed_ms)
+        rows = len(result['data']) if result['data'] else max(result.get('rows_affected') or 0, 0)
         
-        if result['success']:
-            return ExecuteSqlResponse(
-                success=True,
-                query_type=validation['query_type'],
-                execution_time_ms=execution_time,
-                rows_affected=result['rows_affected'],
-                data=result['data'],
-                columns=result['columns'],
-                warnings=validation['warnings']
-            )
+        fingerprint_id = query_stats.record(
+            clean_query,
+            validation['query_type'],
+            elapsed_ms,
+            rows=rows,
+            success=result['success'],
+            error=result.get('error')
+        )
+        tracing.annotate(fingerprint_id=fingerprint_id, rows=rows, pool_wait_ms=timings['pool_wait'])
+        if not result['success']:
+            tracing.fail(result.get('error') or 'query rechazada')
+    
+    for phase, ms in timings.items():
+        SQL_PHASE_SECONDS.observe(ms / 1000, phase)
+    
+    if result['success']:
+        response = ExecuteSqlResponse(
+            success=True,
+            query_type=validation['query_type'],
+            execution_time_ms=execution_time,
+            rows_affected=result['rows_affected'],
+            data=result['data'],
+            columns=result['columns'],
+            warnings=validation['warnings'],
+            plan=result.get('plan')
+        )
+    else:
+        response = ExecuteSqlResponse(
+            success=False,
+            query_type=validation['query_type'],
+            execution_time_ms=execution_time,
+            errors=[result['error']],
+            warnings=validation['warnings'],
+            plan=result.get('plan')
+        )
+    
+    return response, timings
+
+@app.post("/execute-sql", response_model=ExecuteSqlResponse)
+async def execute_sql(request: ExecuteSqlRequest):
+    try:
+        response, timings = await _run_execute_sql(request)
+        if timings is None:
+            return response
+        
+        # Serializar aquí (en vez de dejarlo a FastAPI) para poder medir la fase
+        serialize_start = time.perf_counter()
+        if request.include_timings:
+            # La fase serialize debe ir dentro del cuerpo: se mide el volcado del modelo
+            # y el dict resultante (ya con los tiempos) se codifica después
+            content = response.model_dump(mode='json', exclude={'timings'})
         else:
-            return ExecuteSqlResponse(
-                success=False,
-                query_type=validation['query_type'],
-                execution_time_ms=execution_time,
-                errors=[result['error']],
-                warnings=validation['warnings']
-            )
+            body = response.model_dump_json(exclude={'timings'})
+        timings['serialize'] = round((time.perf_counter() - serialize_start) * 1000, 3)
+        SQL_PHASE_SECONDS.observe(timings['serialize'] / 1000, 'serialize')
+        
+        if request.include_timings:
+            content['timings'] = timings
+            body = json.dumps(content, ensure_ascii=False, separators=(',', ':'))
+        
+        return Response(content=body, media_type='application/json')
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _execute_sql_job(payload: Dict[str, Any], job: JobContext) -> Dict[str, Any]:
+    request = ExecuteSqlRequest.model_validate(payload)
+    response, timings = await _run_execute_sql(request)
+    if request.include_timings:
+        response.timings = timings
+    return response.model_dump(mode='json')
+
+job_manager.register('execute_sql', _execute_sql_job)
+
+@app.post("/jobs/execute-sql")
+async def submit_execute_sql_job(
+    request: ExecuteSqlRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    """Encola una query larga (p. ej. una exportación); el avance se sigue en /jobs/{id}/events"""
+    return await _submit_job('execute_sql', request.model_dump(), idempotency_key, response)
+
+@app.get("/sql-stats")
+async def get_sql_stats(order_by: str = 'total_time_ms', limit: int = 50):
+    """Estadísticas agregadas por fingerprint de query"""
+    try:
+        return {
+            'summary': query_stats.summary(),
+            'fingerprints': query_stats.get_stats(order_by, limit),
+            'phases': SQL_PHASE_SECONDS.snapshot()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/sql-stats/slow-queries")
+async def get_slow_queries(limit: int = 50):
+    """Log acotado de queries que superaron el umbral de lentitud"""
+    return {
+        'threshold_ms': query_stats.slow_threshold_ms,
+        'queries': query_stats.get_slow_queries(limit)
+    }
+
+@app.delete("/sql-stats")
+async def reset_sql_stats():
+    query_stats.reset()
+    return {'success': True, 'message': 'Estadísticas SQL reiniciadas'}
+
 @app.post("/database-info", response_model=DatabaseInfoResponse)
 async def get_database_info(request: DatabaseInfoRequest):
     try:
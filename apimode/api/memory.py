@@ -0,0 +1,214 @@
+"""
+Diagnóstico de memoria del proceso: RSS, tracemalloc y snapshots comparables
+
+tracemalloc se activa solo bajo demanda (tiene costo en cada asignación). Las
+snapshots se guardan en memoria, ya filtradas de las asignaciones del propio
+tracemalloc y del sistema de imports, y se comparan por sitio de asignación
+(archivo:línea, archivo o traceback).
+
+Configuración por variables de entorno:
+    MEMORY_SNAPSHOTS_MAX    Snapshots conservadas (por defecto 10; se descartan las más antiguas)
+    MEMORY_TRACE_FRAMES     Frames por traceback al iniciar tracemalloc (por defecto 1)
+"""
+
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SNAPSHOTS_MAX = int(os.getenv('MEMORY_SNAPSHOTS_MAX', '10'))
+DEFAULT_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', '1'))
+
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+def process_memory() -> Dict[str, Any]:
+    """RSS actual y máximo del proceso (en bytes), GC e hilos"""
+    rss = peak = None
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if peak is None:
+        try:
+            import resource
+        except ImportError:
+            # resource no existe en Windows
+            pass
+        else:
+            # ru_maxrss está en KB en Linux y en bytes en macOS
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    return {
+        'pid': os.getpid(),
+        'rss_bytes': rss,
+        'peak_rss_bytes': peak,
+        'gc_counts': gc.get_count(),
+        'gc_objects_tracked': len(gc.get_objects()),
+        'threads': threading.active_count()
+    }
+
+
+class MemoryDiagnostics:
+    """Control de tracemalloc y almacén de snapshots para comparar"""
+
+    def __init__(self, max_snapshots: int = DEFAULT_SNAPSHOTS_MAX):
+        self.max_snapshots = max_snapshots
+        self._snapshots: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, frames: Optional[int] = None) -> Dict[str, Any]:
+        """Activa tracemalloc guardando frames niveles de traceback por asignación"""
+        frames = max(frames or DEFAULT_TRACE_FRAMES, 1)
+        if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+            # El límite de frames solo se puede cambiar reiniciando
+            tracemalloc.stop()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Detiene tracemalloc (las snapshots tomadas se conservan)"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [self._info(snapshot_id, entry) for snapshot_id, entry in self._snapshots.items()]
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else None,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'overhead_bytes': tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            'snapshots': snapshots
+        }
+
+    def take_snapshot(self, label: Optional[str] = None) -> Dict[str, Any]:
+        """Snapshot de las asignaciones vivas (requiere tracemalloc activo)"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc no está activo: iniciarlo antes de tomar snapshots")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        entry = {
+            'snapshot': snapshot,
+            'label': label,
+            'created_at': datetime.now().isoformat(),
+            'traced_bytes': sum(stat.size for stat in snapshot.statistics('filename')),
+            'rss_bytes': process_memory()['rss_bytes']
+        }
+        snapshot_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            self._snapshots[snapshot_id] = entry
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return self._info(snapshot_id, entry)
+
+    def top(self, snapshot_id: str, key_type: str = 'lineno', limit: int = 25) -> Dict[str, Any]:
+        """Sitios de asignación con más memoria en la snapshot"""
+        entry = self._get(snapshot_id)
+        stats = entry['snapshot'].statistics(_key_type(key_type))
+        return {
+            **self._info(snapshot_id, entry),
+            'key_type': key_type,
+            'statistics': [_stat(stat) for stat in stats[:limit]]
+        }
+
+    def diff(
+        self,
+        base_id: str,
+        target_id: Optional[str] = None,
+        key_type: str = 'lineno',
+        limit: int = 25
+    ) -> Dict[str, Any]:
+        """Diferencias por sitio de asignación (sin target_id, contra una snapshot nueva)"""
+        key_type = _key_type(key_type)
+        base = self._get(base_id)
+        target_info = self.take_snapshot(label='diff') if target_id is None else None
+        target_id = target_id or target_info['id']
+        target = self._get(target_id)
+
+        stats = target['snapshot'].compare_to(base['snapshot'], key_type)
+        return {
+            'base': self._info(base_id, base),
+            'target': self._info(target_id, target),
+            'key_type': key_type,
+            'size_diff_bytes': target['traced_bytes'] - base['traced_bytes'],
+            'rss_diff_bytes': (
+                target['rss_bytes'] - base['rss_bytes']
+                if target['rss_bytes'] is not None and base['rss_bytes'] is not None else None
+            ),
+            'statistics': [_stat_diff(stat) for stat in stats[:limit]]
+        }
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._snapshots)
+            self._snapshots.clear()
+        return count
+
+    def _get(self, snapshot_id: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(f"Snapshot de memoria no encontrada: {snapshot_id}")
+        return entry
+
+    @staticmethod
+    def _info(snapshot_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': snapshot_id,
+            'label': entry['label'],
+            'created_at': entry['created_at'],
+            'traced_bytes': entry['traced_bytes'],
+            'rss_bytes': entry['rss_bytes']
+        }
+
+
+def _key_type(key_type: str) -> str:
+    if key_type not in KEY_TYPES:
+        raise ValueError(f"key_type inválido: {key_type} (usar {', '.join(KEY_TYPES)})")
+    return key_type
+
+
+def _traceback(stat) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+
+
+def _stat(stat: tracemalloc.Statistic) -> Dict[str, Any]:
+    return {'site': _traceback(stat), 'size_bytes': stat.size, 'count': stat.count}
+
+
+def _stat_diff(stat: tracemalloc.StatisticDiff) -> Dict[str, Any]:
+    return {
+        'site': _traceback(stat),
+        'size_bytes': stat.size,
+        'size_diff_bytes': stat.size_diff,
+        'count': stat.count,
+        'count_diff': stat.count_diff
+    }
+
+
+memory_diagnostics = MemoryDiagnostics()
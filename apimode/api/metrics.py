@@ -0,0 +1,350 @@
+"""
+Métricas en memoria del proceso con exportación en formato de texto Prometheus
+
+Las actualizaciones no usan locks: con el GIL, en el peor caso se pierde un
+incremento concurrente, lo que es aceptable para métricas operativas.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, List, Any, Tuple, Callable, Optional
+
+import progress
+import tracing
+
+# Buckets en segundos, de 0.5 ms a 30 s
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+class _CounterChild:
+    """Serie de un contador o gauge para una combinación de labels"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    """Serie de un histograma para una combinación de labels"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # El último contador corresponde a +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """Base común: nombre, descripción y series por labels"""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        REGISTRY.register(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *label_values: str) -> Any:
+        """Obtiene (o crea) la serie; conviene guardar la referencia en rutas calientes"""
+        child = self._children.get(label_values)
+        if child is None:
+            child = self._children.setdefault(label_values, self._new_child())
+        return child
+
+    def series(self) -> List[Tuple[Dict[str, str], Any]]:
+        return [
+            (dict(zip(self.label_names, label_values)), child)
+            for label_values, child in list(self._children.items())
+        ]
+
+
+class Counter(_Metric):
+    """Contador monótono"""
+
+    type = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, *label_values: str) -> None:
+        self.labels(*label_values).inc(amount)
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja; opcionalmente calculado al momento de exportar"""
+
+    type = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...] = (),
+        callback: Optional[Callable[[], Any]] = None
+    ):
+        super().__init__(name, description, label_names)
+        # callback retorna un número o un dict {tupla_de_labels: número}
+        self.callback = callback
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def set(self, value: float, *label_values: str) -> None:
+        self.labels(*label_values).set(value)
+
+    def series(self) -> List[Tuple[Dict[str, str], Any]]:
+        if self.callback is None:
+            return super().series()
+
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+
+        if not isinstance(values, dict):
+            values = {(): values}
+
+        series = []
+        for label_values, value in values.items():
+            child = _CounterChild()
+            child.set(float(value or 0))
+            series.append((dict(zip(self.label_names, label_values)), child))
+        return series
+
+
+class Histogram(_Metric):
+    """Histograma acumulativo al estilo Prometheus"""
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, label_names)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        self.labels(*label_values).observe(value)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Copia serializable de todas las series"""
+        snapshot = []
+        for labels, child in self.series():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                buckets[_format_bound(bound)] = cumulative
+            snapshot.append({
+                'labels': labels,
+                'count': child.count,
+                'sum': round(child.sum, 6),
+                'buckets': buckets
+            })
+        return snapshot
+
+
+class PhaseTimer:
+    """Cronómetro de fases consecutivas (en milisegundos)
+
+    Con report, cada fase cerrada se emite también como evento de progreso 'timing'.
+    Con trace, cada fase se registra como span hijo del activo ("<trace>.<fase>").
+    """
+
+    def __init__(self, report: bool = False, trace: Optional[str] = None, **labels: Any):
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+        self._report = report
+        self._trace = trace
+        self._labels = labels
+
+    def lap(self, phase: str) -> float:
+        """Cierra la fase actual y la acumula bajo el nombre indicado"""
+        now = time.perf_counter()
+        elapsed = (now - self._last) * 1000
+        self.timings[phase] = self.timings.get(phase, 0.0) + elapsed
+        self._last = now
+        if self._report:
+            progress.report('timing', phase=phase, ms=round(elapsed, 3), **self._labels)
+        if self._trace:
+            tracing.record(f"{self._trace}.{phase}", elapsed, **self._labels)
+        return elapsed
+
+    def as_dict(self) -> Dict[str, float]:
+        return {phase: round(ms, 3) for phase, ms in self.timings.items()}
+
+
+class EventLoopLagMonitor:
+    """Mide el retraso del event loop durmiendo un intervalo fijo"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        lag_gauge = EVENT_LOOP_LAG.labels()
+        lag_histogram = EVENT_LOOP_LAG_SECONDS.labels()
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            lag_gauge.set(lag)
+            lag_histogram.observe(lag)
+
+
+class MetricsRegistry:
+    """Registro de todas las métricas del proceso"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def all(self) -> List[_Metric]:
+        return list(self._metrics.values())
+
+    def render_prometheus(self) -> str:
+        """Genera la exposición en formato de texto Prometheus 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            series = metric.series()
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+
+            for labels, child in series:
+                if metric.type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float('inf'),), child.counts):
+                        cumulative += count
+                        bucket_labels = _format_labels({**labels, 'le': _format_bound(bound)})
+                        lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {child.count}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(child.value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()) + '}'
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP
+HTTP_REQUESTS_TOTAL = Counter(
+    'mcp_http_requests_total',
+    'Peticiones HTTP atendidas',
+    label_names=('route', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'mcp_http_request_duration_seconds',
+    'Latencia de las peticiones HTTP por ruta',
+    label_names=('route',)
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'mcp_http_requests_in_flight',
+    'Peticiones HTTP en curso por ruta',
+    label_names=('route',)
+)
+
+# Generación
+TEMPLATE_RENDER_SECONDS = Histogram(
+    'mcp_template_render_seconds',
+    'Tiempo de render de cada template',
+    label_names=('template',)
+)
+GENERATED_FILES_TOTAL = Counter(
+    'mcp_generated_files_total',
+    'Archivos escritos por el generador',
+    label_names=('type',)
+)
+GENERATED_BYTES_TOTAL = Counter(
+    'mcp_generated_bytes_total',
+    'Bytes escritos por el generador'
+)
+
+# SQL
+SQL_PHASE_SECONDS = Histogram(
+    'mcp_sql_phase_seconds',
+    'Duración de cada fase de una petición SQL',
+    label_names=('phase',)
+)
+
+# Event loop
+EVENT_LOOP_LAG = Gauge(
+    'mcp_event_loop_lag_seconds',
+    'Último retraso medido del event loop'
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    'mcp_event_loop_lag_distribution_seconds',
+    'Distribución del retraso del event loop'
+)
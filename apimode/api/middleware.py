@@ -0,0 +1,203 @@
+"""
+Middlewares ASGI de la API
+"""
+
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Tuple, Any
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+
+import tracing
+from metrics import HTTP_REQUESTS_TOTAL, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
+from profiling import StackSampler, profile_store, token_matches
+
+logger = logging.getLogger(__name__)
+
+# Label usado para rutas desconocidas (evita cardinalidad ilimitada)
+UNMATCHED_ROUTE = 'other'
+
+
+class RouteTable:
+    """Resuelve la ruta declarada (ej: /jobs/{job_id}) de un path con una tabla
+    precalculada, para no instanciar objetos por petición"""
+
+    def __init__(self):
+        self._static_routes: Dict[str, str] = {}
+        self._dynamic_routes: List[Tuple[re.Pattern, str]] = []
+        self._loaded = False
+
+    def _load(self, app) -> None:
+        for route in app.routes:
+            path = getattr(route, 'path', None)
+            if path is None:
+                continue
+            if getattr(route, 'param_convertors', None):
+                self._dynamic_routes.append((route.path_regex, path))
+            else:
+                self._static_routes[path] = path
+        self._loaded = True
+
+    def label(self, scope) -> str:
+        if not self._loaded:
+            self._load(scope['app'])
+        path = scope['path']
+        label = self._static_routes.get(path)
+        if label is not None:
+            return label
+        for regex, template in self._dynamic_routes:
+            if regex.match(path):
+                return template
+        return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Registra conteo, latencia y peticiones en curso por ruta
+
+    El label de ruta es la plantilla declarada, para acotar la cardinalidad.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = RouteTable()
+        self._series: Dict[str, Tuple[Any, Any]] = {}
+
+    def _route_series(self, route: str) -> Tuple[Any, Any]:
+        series = self._series.get(route)
+        if series is None:
+            series = (HTTP_REQUEST_SECONDS.labels(route), HTTP_REQUESTS_IN_FLIGHT.labels(route))
+            self._series[route] = series
+        return series
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        route = self._routes.label(scope)
+        latency, in_flight = self._route_series(route)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency.observe(time.perf_counter() - started)
+            in_flight.dec()
+            HTTP_REQUESTS_TOTAL.labels(route, scope['method'], str(status)).inc()
+
+
+class TracingMiddleware:
+    """Abre el span raíz de cada petición y devuelve su id en X-Trace-Id
+
+    Continúa la traza de una cabecera W3C traceparent entrante. Las rutas de
+    exclude (health, métricas, las propias trazas) no se trazan.
+    """
+
+    def __init__(self, app, exclude: Iterable[str] = ()):
+        self.app = app
+        self.exclude = frozenset(exclude)
+        self._routes = RouteTable()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not tracing.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route = self._routes.label(scope)
+        if route in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope['headers']:
+            if name == b'traceparent':
+                traceparent = tracing.parse_traceparent(value.decode('latin-1'))
+                break
+
+        with tracing.span(
+            f"{scope['method']} {route}",
+            remote=traceparent,
+            kind=tracing.SPAN_KIND_SERVER,
+            **{'http.request.method': scope['method'], 'http.route': route}
+        ) as span:
+            async def send_wrapper(message):
+                if message['type'] == 'http.response.start':
+                    span.set(**{'http.response.status_code': message['status']})
+                    if message['status'] >= 500:
+                        span.fail(f"HTTP {message['status']}")
+                    message['headers'] = [*message.get('headers', []), (b'x-trace-id', span.trace_id.encode('ascii'))]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class ProfilingMiddleware:
+    """Perfila las peticiones que traen X-Profile: <token> o ?profile=<token>
+
+    Solo se instala si PROFILING_TOKEN está definido. Se perfila una petición a la
+    vez; el id del perfil se devuelve en la cabecera X-Profile-Id y las pilas se
+    obtienen en GET /profiles/{id}.
+    """
+
+    def __init__(self, app, token: str, store=None):
+        self.app = app
+        self.token = token
+        self.store = store or profile_store
+        self._active = False
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope['headers']:
+            if name == b'x-profile':
+                return token_matches(value.decode('latin-1'), self.token)
+        query = scope.get('query_string', b'')
+        if b'profile=' in query:
+            values = parse_qs(query.decode('latin-1')).get('profile')
+            return bool(values) and token_matches(values[0], self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http'
+            or self._active
+            or not self._requested(scope)
+            or scope['path'].startswith('/profiles')
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile_id = self.store.new_id()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message['headers'] = [*message.get('headers', []), (b'x-profile-id', profile_id.encode('ascii'))]
+            await send(message)
+
+        sampler = StackSampler().start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                await anyio.to_thread.run_sync(sampler.stop)
+                await anyio.to_thread.run_sync(
+                    self.store.save, profile_id, scope['method'], scope['path'], status, duration_ms, sampler
+                )
+            except OSError:
+                logger.exception("No se pudo guardar el perfil %s", profile_id)
+            finally:
+                self._active = False
@@ -86,10 +86,21 @@ class GenerationResult(BaseModel):
     files_created: List[str] = Field(alias="filesCreated")
     errors: Optional[List[str]] = None
     warnings: Optional[List[str]] = None
+    entity_name: Optional[str] = Field(default=None, alias="entityName")  # Informado en generación por lotes
+    changes: Optional[Dict[str, int]] = None  # created / updated / unchanged / skipped
 
     class Config:
         populate_by_name = True
 
+# Resultado de la generación por lotes
+class BatchGenerationResult(BaseModel):
+    success: bool
+    message: str
+    mode: Literal['thread', 'process']  # Dónde se renderizaron los templates
+    results: List[GenerationResult]  # En el mismo orden de las configuraciones
+    errors: Optional[List[str]] = None
+    timings: Dict[str, float] = {}  # Milisegundos por fase del lote
+
 # Opciones para el generador
 class GeneratorOptions(BaseModel):
     overwrite: bool = False
@@ -120,6 +131,14 @@ class GeneratedFile(BaseModel):
     type: Literal['component', 'page', 'api', 'type', 'hook', 'validation', 'other']
     description: str
     dependencies: Optional[List[str]] = None
+    status: Literal['created', 'updated', 'unchanged'] = 'created'
+    content_hash: Optional[str] = None
+
+# Archivo renderizado en memoria (sin escribir en disco)
+class RenderedFile(BaseModel):
+    path: str  # Ruta relativa dentro del módulo
+    type: Literal['component', 'page', 'api', 'type', 'hook', 'validation', 'other']
+    content: str
 
 # Configuración del MCP
 class MCPConfig(BaseModel):
@@ -150,6 +169,17 @@ class ValidationResult(BaseModel):
     errors: List[ValidationError]
     warnings: List[str]
 
+# Resultado de un elemento de la validación por lotes
+class ItemValidationResult(ValidationResult):
+    index: int  # Posición en la lista del request
+    name: Optional[str] = None  # entityName de la configuración o name del campo
+
+# Resultado de la validación por lotes (por elemento y entre entidades)
+class BatchValidationResult(BaseModel):
+    valid: bool
+    configs: List[ItemValidationResult] = []
+    fields: List[ItemValidationResult] = []
+
 # Helper types para TypeScript templates
 TypeScriptType = Literal['string', 'number', 'boolean', 'Date', 'File', 'any']
 
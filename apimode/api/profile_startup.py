@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Perfil del tiempo de arranque de la API
+
+Importa main en procesos nuevos (con -X importtime) y mide por separado el
+import y el startup del lifespan. Reporta los módulos más costosos y verifica
+que los subsistemas pesados no se carguen al importar.
+
+Con --budget-ms (o STARTUP_BUDGET_MS) termina con código 1 si la mediana de
+import + startup supera el presupuesto o si algún módulo perezoso se cargó
+al importar; pensado para correr en CI.
+
+Uso:
+    python profile_startup.py [--runs 5] [--top 15] [--budget-ms 800] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Módulos que solo deben cargarse en el primer uso
+LAZY_MODULES = ('crud_generator', 'jinja2', 'pyodbc', 'archive', 'snapshots', 'staging', 'result_cache')
+
+_PROBE = '''
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+lazy = [name for name in {lazy!r} if name in sys.modules]
+
+async def startup():
+    async with main.lifespan(main.app):
+        ready = time.perf_counter()
+    return ready
+
+ready = asyncio.run(startup())
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'startup_ms': (ready - imported) * 1000,
+    'eager_lazy_modules': lazy
+}}))
+'''
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(módulo, self us, acumulado us) de la salida de -X importtime"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile(runs: int) -> Dict[str, Any]:
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, 'WARM_UP': os.getenv('WARM_UP', '0')}
+    samples = []
+    modules: Dict[str, List[int]] = {}
+
+    for _ in range(max(runs, 1)):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _PROBE.format(lazy=LAZY_MODULES)],
+            cwd=app_dir, env=env, capture_output=True, text=True, check=False
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'probe falló')
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        for name, self_us, _ in _parse_importtime(completed.stderr):
+            modules.setdefault(name, []).append(self_us)
+
+    import_ms = statistics.median(sample['import_ms'] for sample in samples)
+    startup_ms = statistics.median(sample['startup_ms'] for sample in samples)
+    return {
+        'runs': len(samples),
+        'import_ms': round(import_ms, 1),
+        'startup_ms': round(startup_ms, 1),
+        'total_ms': round(import_ms + startup_ms, 1),
+        'eager_lazy_modules': sorted({name for sample in samples for name in sample['eager_lazy_modules']}),
+        'modules': sorted(
+            ((name, round(statistics.median(values) / 1000, 2)) for name, values in modules.items()),
+            key=lambda item: item[1],
+            reverse=True
+        )
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Mide el tiempo de arranque de la API')
+    parser.add_argument('--runs', type=int, default=5, help='Procesos a medir (se reporta la mediana)')
+    parser.add_argument('--top', type=int, default=15, help='Módulos más costosos a mostrar')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', '0')) or None)
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args(argv)
+
+    result = profile(args.runs)
+    result['modules'] = result['modules'][:args.top]
+
+    failures = []
+    if args.budget_ms is not None and result['total_ms'] > args.budget_ms:
+        failures.append(f"arranque de {result['total_ms']} ms supera el presupuesto de {args.budget_ms:g} ms")
+    if args.budget_ms is not None and result['eager_lazy_modules']:
+        failures.append(f"módulos cargados al importar: {', '.join(result['eager_lazy_modules'])}")
+
+    if args.json:
+        print(json.dumps({**result, 'failures': failures}, indent=2))
+    else:
+        print(f"import: {result['import_ms']} ms  startup: {result['startup_ms']} ms  "
+              f"total: {result['total_ms']} ms  (mediana de {result['runs']})")
+        print(f"módulos perezosos cargados al importar: {', '.join(result['eager_lazy_modules']) or 'ninguno'}")
+        print('módulos más costosos (self ms):')
+        for name, ms in result['modules']:
+            print(f"  {ms:>8.2f}  {name}")
+        for failure in failures:
+            print(f"FALLO: {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
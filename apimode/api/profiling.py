@@ -0,0 +1,206 @@
+"""
+Perfilado bajo demanda de peticiones individuales
+
+Un muestreador recorre periódicamente las pilas de todos los hilos del proceso
+(sys._current_frames) mientras dura la petición, por lo que también ve el
+trabajo enviado al threadpool y al executor de render. Las pilas se guardan en
+formato "collapsed" (una línea "hilo;marco;...;marco N" por pila), que leen
+directamente flamegraph.pl, speedscope e inferno.
+
+Al muestrear el proceso completo, las peticiones concurrentes en el mismo
+worker también aparecen en el perfil. Las muestras de hilos en espera
+(selector del loop, colas de los pools) se descartan.
+
+Configuración por variables de entorno:
+    PROFILING_TOKEN         Token que habilita el perfilado, /traces y /memory (sin él, desactivados)
+    PROFILE_DIR             Directorio de perfiles (por defecto <tmp>/mcp-creator-profiles; debe
+                            ser del usuario del proceso y no escribible por otros)
+    PROFILE_KEEP            Perfiles conservados (por defecto 50)
+    PROFILE_INTERVAL_MS     Intervalo de muestreo (por defecto 5)
+    PROFILE_MAX_SECONDS     Duración máxima del muestreo (por defecto 120)
+"""
+
+import hmac
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from utils import FileUtils
+
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN') or None
+DEFAULT_PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'mcp-creator-profiles'))
+DEFAULT_PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+DEFAULT_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+DEFAULT_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '120'))
+
+# Un marco hoja en estos módulos (o funciones) indica un hilo esperando trabajo, no ejecutándolo
+IDLE_MODULES = frozenset({'selectors.py', 'threading.py', 'queue.py'})
+IDLE_FUNCTIONS = frozenset({('thread.py', '_worker')})  # concurrent.futures bloqueado en SimpleQueue.get
+
+
+def token_matches(candidate: Optional[str], token: Optional[str] = None) -> bool:
+    """Compara en tiempo constante con PROFILING_TOKEN (siempre False si no hay token)"""
+    token = token or PROFILING_TOKEN
+    if not token or not candidate:
+        return False
+    return hmac.compare_digest(candidate.encode('utf-8'), token.encode('utf-8'))
+
+
+class ProfileInfo(BaseModel):
+    """Metadatos de un perfil guardado"""
+    id: str
+    method: str
+    path: str
+    status: int
+    created_at: str
+    duration_ms: float
+    samples: int
+    interval_ms: float
+
+
+class StackSampler:
+    """Muestreador de pilas de todos los hilos en un hilo propio"""
+
+    def __init__(self, interval_ms: float = DEFAULT_INTERVAL_MS, max_seconds: float = DEFAULT_MAX_SECONDS):
+        self.interval_ms = interval_ms
+        self.max_seconds = max_seconds
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        interval = self.interval_ms / 1000
+
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or _is_idle(frame):
+                    continue
+                self.stacks[_collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+
+def _is_idle(frame) -> bool:
+    module = os.path.basename(frame.f_code.co_filename)
+    return module in IDLE_MODULES or (module, frame.f_code.co_name) in IDLE_FUNCTIONS
+
+
+def _collapse(thread_name: str, frame) -> str:
+    """Pila en formato collapsed, de la raíz a la hoja"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    parts.append(thread_name)
+    return ';'.join(part.replace(';', ':') for part in reversed(parts))
+
+
+class ProfileStore:
+    """Perfiles guardados en disco (.json con metadatos y .collapsed con las pilas)"""
+
+    def __init__(self, root: str = DEFAULT_PROFILE_DIR, keep: int = DEFAULT_PROFILE_KEEP):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+    def save(
+        self,
+        profile_id: str,
+        method: str,
+        path: str,
+        status: int,
+        duration_ms: float,
+        sampler: StackSampler
+    ) -> ProfileInfo:
+        info = ProfileInfo(
+            id=profile_id,
+            method=method,
+            path=path,
+            status=status,
+            created_at=datetime.now().isoformat(),
+            duration_ms=round(duration_ms, 2),
+            samples=sampler.samples,
+            interval_ms=sampler.interval_ms
+        )
+        collapsed = ''.join(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+
+        with self._lock:
+            # Las pilas revelan rutas y nombres internos: solo el usuario del proceso puede leerlas
+            FileUtils.ensure_private_directory(self.root)
+            _write_atomic(os.path.join(self.root, f"{info.id}.collapsed"), collapsed.encode('utf-8'))
+            _write_atomic(os.path.join(self.root, f"{info.id}.json"), info.model_dump_json(indent=2).encode('utf-8'))
+            self._prune()
+        return info
+
+    def list(self) -> List[ProfileInfo]:
+        """Perfiles guardados (más recientes primero)"""
+        if not os.path.isdir(self.root):
+            return []
+        FileUtils.ensure_private_directory(self.root)
+        profiles = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.json'):
+                continue
+            try:
+                profiles.append(ProfileInfo.model_validate_json(Path(self.root, name).read_bytes()))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda info: info.created_at, reverse=True)
+        return profiles
+
+    def read(self, profile_id: str) -> bytes:
+        """Pilas collapsed del perfil"""
+        path = os.path.join(self.root, f"{os.path.basename(profile_id)}.collapsed")
+        FileUtils.ensure_private_directory(self.root)
+        try:
+            return Path(path).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(f"Perfil no encontrado: {profile_id}")
+
+    def _prune(self) -> None:
+        for info in self.list()[self.keep:]:
+            for suffix in ('.json', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.root, f"{info.id}{suffix}"))
+                except FileNotFoundError:
+                    pass
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+profile_store = ProfileStore()
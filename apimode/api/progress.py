@@ -0,0 +1,37 @@
+"""
+Eventos de progreso de operaciones largas (generación, SQL)
+
+El código instrumentado llama a report(); el evento llega al receptor activo
+en el contexto actual (p. ej. el trabajo en ejecución) o se descarta si no hay
+ninguno. El receptor viaja en un ContextVar, por lo que también lo ven las
+tareas y los hilos lanzados con asyncio.to_thread / run_in_threadpool.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+ProgressSink = Callable[[str, Dict[str, Any]], None]
+
+_current_sink: ContextVar[Optional[ProgressSink]] = ContextVar('progress_sink', default=None)
+
+
+def report(event: str, **data: Any) -> None:
+    """Emite un evento de progreso (sin costo si nadie escucha)"""
+    sink = _current_sink.get()
+    if sink is not None:
+        sink(event, data)
+
+
+def is_active() -> bool:
+    return _current_sink.get() is not None
+
+
+@contextmanager
+def reporting_to(sink: ProgressSink) -> Iterator[None]:
+    """Dirige los eventos del bloque (y de lo que se lance desde él) al receptor"""
+    token = _current_sink.set(sink)
+    try:
+        yield
+    finally:
+        _current_sink.reset(token)
@@ -0,0 +1,180 @@
+"""
+Estadísticas agregadas de queries SQL por fingerprint y log de queries lentas
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from sql_utils import SqlTokenizer
+
+
+class FingerprintStats:
+    """Agregado en memoria para un fingerprint de query"""
+
+    # Latencias recientes usadas para calcular percentiles
+    LATENCY_SAMPLES = 1024
+
+    def __init__(self, fingerprint_id: str, fingerprint: str, query_type: str):
+        self.fingerprint_id = fingerprint_id
+        self.fingerprint = fingerprint
+        self.query_type = query_type
+        self.count = 0
+        self.error_count = 0
+        self.rows_returned = 0
+        self.total_time_ms = 0.0
+        self.max_time_ms = 0.0
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+
+    def record(self, duration_ms: float, rows: int, success: bool) -> None:
+        self.count += 1
+        self.total_time_ms += duration_ms
+        self.max_time_ms = max(self.max_time_ms, duration_ms)
+        self.latencies.append(duration_ms)
+        self.last_seen = time.time()
+        if success:
+            self.rows_returned += rows
+        else:
+            self.error_count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            'fingerprint_id': self.fingerprint_id,
+            'fingerprint': self.fingerprint,
+            'query_type': self.query_type,
+            'count': self.count,
+            'error_count': self.error_count,
+            'rows_returned': self.rows_returned,
+            'total_time_ms': round(self.total_time_ms, 2),
+            'avg_time_ms': round(self.total_time_ms / self.count, 2) if self.count else 0.0,
+            'max_time_ms': round(self.max_time_ms, 2),
+            'p50_ms': _percentile(latencies, 50),
+            'p95_ms': _percentile(latencies, 95),
+            'p99_ms': _percentile(latencies, 99),
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat()
+        }
+
+
+class QueryStatsCollector:
+    """Registro acotado de estadísticas por fingerprint y de queries lentas"""
+
+    ORDER_FIELDS = ('total_time_ms', 'count', 'p95_ms', 'p99_ms', 'error_count', 'rows_returned', 'last_seen')
+
+    def __init__(
+        self,
+        max_fingerprints: int = 1000,
+        slow_log_size: int = 200,
+        slow_threshold_ms: float = 1000.0
+    ):
+        self.max_fingerprints = max_fingerprints
+        self.slow_threshold_ms = slow_threshold_ms
+        self._stats: 'OrderedDict[str, FingerprintStats]' = OrderedDict()
+        self._slow_log = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(query: str) -> Dict[str, str]:
+        """Calcula el fingerprint normalizado y su identificador corto"""
+        fingerprint = SqlTokenizer.fingerprint(query)
+        return {
+            'fingerprint': fingerprint,
+            'fingerprint_id': hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+        }
+
+    def record(
+        self,
+        query: str,
+        query_type: str,
+        duration_ms: float,
+        rows: int = 0,
+        success: bool = True,
+        error: Optional[str] = None
+    ) -> str:
+        """Registra una ejecución y retorna el id del fingerprint"""
+        fp = self.fingerprint(query)
+        fingerprint_id = fp['fingerprint_id']
+
+        with self._lock:
+            stats = self._stats.get(fingerprint_id)
+            if stats is None:
+                stats = FingerprintStats(fingerprint_id, fp['fingerprint'], query_type)
+                self._stats[fingerprint_id] = stats
+                # Descartar el fingerprint usado hace más tiempo
+                if len(self._stats) > self.max_fingerprints:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(fingerprint_id)
+
+            stats.record(duration_ms, rows, success)
+
+            if duration_ms >= self.slow_threshold_ms:
+                self._slow_log.append({
+                    'timestamp': datetime.now().isoformat(),
+                    'fingerprint_id': fingerprint_id,
+                    'fingerprint': fp['fingerprint'],
+                    'query_type': query_type,
+                    'duration_ms': round(duration_ms, 2),
+                    'rows': rows,
+                    'success': success,
+                    'error': error
+                })
+
+        return fingerprint_id
+
+    def get_stats(self, order_by: str = 'total_time_ms', limit: int = 50) -> List[Dict[str, Any]]:
+        """Retorna los agregados ordenados por el campo indicado (descendente)"""
+        if order_by not in self.ORDER_FIELDS:
+            raise ValueError(f"order_by no válido: {order_by}. Opciones: {', '.join(self.ORDER_FIELDS)}")
+
+        with self._lock:
+            entries = [stats.to_dict() for stats in self._stats.values()]
+
+        entries.sort(key=lambda entry: entry[order_by], reverse=True)
+        return entries[:limit]
+
+    def get_slow_queries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Retorna las queries lentas más recientes primero"""
+        with self._lock:
+            entries = list(self._slow_log)
+        return entries[::-1][:limit]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'fingerprints': len(self._stats),
+                'max_fingerprints': self.max_fingerprints,
+                'executions': sum(stats.count for stats in self._stats.values()),
+                'errors': sum(stats.error_count for stats in self._stats.values()),
+                'slow_queries': len(self._slow_log),
+                'slow_threshold_ms': self.slow_threshold_ms
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._slow_log.clear()
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> Optional[float]:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return None
+    index = max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)
+    return round(sorted_values[index], 2)
+
+
+# Instancia compartida por el proceso
+query_stats = QueryStatsCollector(
+    max_fingerprints=int(os.getenv('SQL_STATS_MAX_FINGERPRINTS', '1000')),
+    slow_log_size=int(os.getenv('SQL_SLOW_LOG_SIZE', '200')),
+    slow_threshold_ms=float(os.getenv('SQL_SLOW_QUERY_MS', '1000'))
+)
@@ -0,0 +1,123 @@
+"""
+Cache acotado de resultados de generación, direccionado por contenido
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+DEFAULT_CACHE_ENTRIES = int(os.getenv('GENERATION_CACHE_ENTRIES', '128'))
+DEFAULT_CACHE_BYTES = int(float(os.getenv('GENERATION_CACHE_MB', '64')) * 1024 * 1024)
+
+
+class CachedModule:
+    """Salidas renderizadas de una configuración (template -> hash del contenido)"""
+
+    __slots__ = ('timestamp', 'files')
+
+    def __init__(self, timestamp: str, files: Dict[str, str]):
+        self.timestamp = timestamp
+        self.files = files
+
+
+class GenerationCache:
+    """Cache LRU de (configuración, templates, versión) -> archivos renderizados
+
+    Los contenidos se guardan una sola vez por hash (sha256) con conteo de
+    referencias, de modo que archivos idénticos entre entradas no se duplican.
+    El límite de bytes se aplica sobre los contenidos únicos.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, CachedModule]' = OrderedDict()
+        self._blobs: Dict[str, List[Any]] = {}  # hash -> [contenido, bytes, referencias]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(config_hash: str, template_set_hash: str) -> str:
+        """Clave de cache; config_hash ya incluye la versión del generador"""
+        return hashlib.sha256(f"{config_hash}:{template_set_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str, timestamp: Optional[str] = None) -> Optional[CachedModule]:
+        """Retorna el módulo con los contenidos resueltos (template -> contenido)
+
+        Si se indica timestamp, solo sirve una entrada renderizada con ese mismo TIMESTAMP.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (timestamp is not None and entry.timestamp != timestamp):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return CachedModule(
+                entry.timestamp,
+                {name: self._blobs[content_hash][0] for name, content_hash in entry.files.items()}
+            )
+
+    def put(self, key: str, timestamp: str, files: Dict[str, str]) -> None:
+        hashes = {name: hashlib.sha256(content.encode('utf-8')).hexdigest() for name, content in files.items()}
+
+        with self._lock:
+            if key in self._entries:
+                self._release(self._entries.pop(key))
+
+            for name, content_hash in hashes.items():
+                blob = self._blobs.get(content_hash)
+                if blob is None:
+                    size = len(files[name].encode('utf-8'))
+                    self._blobs[content_hash] = [files[name], size, 1]
+                    self._bytes += size
+                else:
+                    blob[2] += 1
+
+            self._entries[key] = CachedModule(timestamp, hashes)
+
+            # Desalojar las entradas usadas hace más tiempo
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._release(evicted)
+                self.evictions += 1
+
+    def _release(self, entry: CachedModule) -> None:
+        for content_hash in entry.files.values():
+            blob = self._blobs[content_hash]
+            blob[2] -= 1
+            if blob[2] == 0:
+                self._bytes -= blob[1]
+                del self._blobs[content_hash]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'unique_blobs': len(self._blobs),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'logical_bytes': sum(
+                    self._blobs[content_hash][1]
+                    for entry in self._entries.values()
+                    for content_hash in entry.files.values()
+                ),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._blobs.clear()
+            self._bytes = 0
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Servidor de producción de la API (start.py queda para desarrollo con reload)
+
+La configuración se toma de las variables de entorno, opcionalmente cargadas
+desde un archivo .env (--env-file o MCP_ENV_FILE). Los argumentos de línea de
+comandos tienen prioridad sobre ambos.
+
+    HOST / PORT             Dirección de escucha (0.0.0.0:8000)
+    WEB_CONCURRENCY         Procesos worker (por defecto min(4, CPUs))
+    UVICORN_BACKLOG         Conexiones pendientes en el socket (2048)
+    KEEPALIVE_TIMEOUT       Segundos de keep-alive HTTP (30)
+    GRACEFUL_TIMEOUT        Segundos para terminar las peticiones en curso al detenerse (30)
+    LIMIT_CONCURRENCY       Conexiones simultáneas por worker antes de responder 503
+    FORWARDED_ALLOW_IPS     IPs de proxies confiables para X-Forwarded-* (127.0.0.1)
+    ACCESS_LOG              1 para el log de acceso de uvicorn (desactivado por defecto)
+    WARM_UP                 0 para no cargar el generador al iniciar (por defecto 1)
+    WARM_BATCH_PROCESSES    1 para arrancar el pool de procesos de lotes al iniciar
+    JOBS_DB_PATH            Base de trabajos; con más de un worker, por defecto
+                            $XDG_STATE_HOME/mcp-creator/jobs-<puerto>.db (compartida entre workers)
+
+uvloop y httptools se usan si están instalados. Salvo WARM_UP=0, cada worker
+carga el generador y precompila los templates antes de recibir tráfico (fuera
+de serve.py la API los carga en el primer uso). Al detenerse, espera los
+trabajos en curso (JOB_DRAIN_TIMEOUT) antes de cerrar los pools.
+
+Uso:
+    python serve.py [--env-file .env] [--workers N] [--port 8000]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import uuid
+from typing import List, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+
+from utils import FileUtils
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _default_jobs_db(port: int) -> str:
+    """Base de trabajos en el directorio de estado del usuario (nunca en un /tmp compartido)"""
+    state_home = os.getenv('XDG_STATE_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'state')
+    state_dir = os.path.join(state_home, 'mcp-creator')
+    try:
+        FileUtils.ensure_private_directory(state_dir)
+    except OSError as e:
+        raise SystemExit(f"No se pudo preparar {state_dir} para la base de trabajos ({e}); definir JOBS_DB_PATH")
+    return os.path.join(state_dir, f'jobs-{port}.db')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Servidor de producción de MCP Creator API')
+    parser.add_argument('--env-file', default=os.getenv('MCP_ENV_FILE', '.env'), help='Archivo .env a cargar')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+
+    # Cargar el .env antes de importar la aplicación: los módulos leen el entorno al importarse.
+    # Las variables ya definidas en el entorno no se sobrescriben.
+    if os.path.isfile(args.env_file):
+        load_dotenv(args.env_file, override=False)
+
+    # Los workers heredan el entorno: todos comparten el boot id, por lo que solo uno
+    # recupera los trabajos pendientes de la ejecución anterior
+    os.environ.setdefault('MCP_SERVER_BOOT_ID', uuid.uuid4().hex)
+    os.environ.setdefault('WARM_UP', '1')
+
+    port = args.port or _env_int('PORT', 8000)
+    workers = args.workers or _env_int('WEB_CONCURRENCY', min(4, os.cpu_count() or 1))
+    if workers > 1:
+        # Con trabajos solo en memoria, /jobs/{id} respondería 404 en los workers que no lo recibieron
+        if not os.getenv('JOBS_DB_PATH'):
+            os.environ['JOBS_DB_PATH'] = _default_jobs_db(port)
+
+    # La aplicación se importa desde este directorio (como start.py)
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+
+    uvicorn.run(
+        'main:app',
+        app_dir=app_dir,
+        host=args.host or os.getenv('HOST', '0.0.0.0'),
+        port=port,
+        workers=workers,
+        loop='uvloop' if _available('uvloop') else 'asyncio',
+        http='httptools' if _available('httptools') else 'h11',
+        backlog=_env_int('UVICORN_BACKLOG', 2048),
+        timeout_keep_alive=_env_int('KEEPALIVE_TIMEOUT', 30),
+        timeout_graceful_shutdown=_env_int('GRACEFUL_TIMEOUT', 30),
+        limit_concurrency=_env_int('LIMIT_CONCURRENCY', None),
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1'),
+        access_log=os.getenv('ACCESS_LOG', '0') == '1',
+        log_level=os.getenv('LOG_LEVEL', 'info').lower(),
+        reload=False
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Snapshots de archivos sobrescritos, guardadas fuera del proyecto
+
+Cada ejecución que sobrescribe archivos editados crea una snapshot. Los
+contenidos se guardan comprimidos (gzip) y direccionados por su sha256, por lo
+que un mismo contenido se almacena una sola vez entre snapshots.
+
+Configuración por variables de entorno:
+    MCP_SNAPSHOT_DIR        Directorio del almacén (por defecto ~/.cache/mcp-creator/snapshots)
+    SNAPSHOT_KEEP           Snapshots conservadas por directorio destino (por defecto 20)
+    SNAPSHOT_MAX_AGE_DAYS   Antigüedad máxima en días (por defecto 30, 0 = sin límite)
+
+Uso:
+    python snapshots.py list [--target DIR]
+    python snapshots.py restore SNAPSHOT_ID [--target DIR] [--file RUTA ...]
+    python snapshots.py prune [--target DIR]
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from staging import StagedCommit
+
+DEFAULT_SNAPSHOT_DIR = os.getenv(
+    'MCP_SNAPSHOT_DIR',
+    str(Path(os.getenv('XDG_CACHE_HOME', str(Path.home() / '.cache'))) / 'mcp-creator' / 'snapshots')
+)
+DEFAULT_KEEP = int(os.getenv('SNAPSHOT_KEEP', '20'))
+DEFAULT_MAX_AGE_DAYS = float(os.getenv('SNAPSHOT_MAX_AGE_DAYS', '30'))
+
+# Objetos sin referencias más nuevos que esto no se eliminan (snapshot en curso en otro proceso)
+ORPHAN_GRACE_SECONDS = 3600
+
+
+class SnapshotInfo(BaseModel):
+    """Metadatos de una snapshot"""
+    id: str
+    target_path: str
+    created_at: str
+    files: Dict[str, str]  # Ruta relativa -> sha256 del contenido
+    size: int  # Bytes sin comprimir
+
+
+class SnapshotStore:
+    """Almacén de snapshots con deduplicación por contenido y retención"""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_SNAPSHOT_DIR,
+        keep: int = DEFAULT_KEEP,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS
+    ):
+        self.root = root
+        self.keep = keep
+        self.max_age_days = max_age_days
+        self._objects_dir = os.path.join(root, 'objects')
+        self._index_dir = os.path.join(root, 'snapshots')
+        self._lock = threading.Lock()
+
+    def create(self, target_path: str, files: Dict[str, str]) -> SnapshotInfo:
+        """Guarda una snapshot a partir de {ruta relativa: archivo a leer} y aplica la retención"""
+        target_path = os.path.abspath(target_path)
+        hashes = {}
+        size = 0
+
+        with self._lock:
+            for relative, source in sorted(files.items()):
+                with open(source, 'rb') as f:
+                    data = f.read()
+                hashes[Path(relative).as_posix()] = self._store_object(data)
+                size += len(data)
+
+            now = datetime.now()
+            info = SnapshotInfo(
+                id=f"{now.strftime('%Y%m%dT%H%M%S%f')}-{hashlib.sha1(target_path.encode('utf-8')).hexdigest()[:8]}",
+                target_path=target_path,
+                created_at=now.isoformat(),
+                files=hashes,
+                size=size
+            )
+            _write_atomic(os.path.join(self._index_dir, f"{info.id}.json"), info.model_dump_json(indent=2).encode('utf-8'))
+
+        self.prune(target_path)
+        return info
+
+    def list(self, target_path: Optional[str] = None) -> List[SnapshotInfo]:
+        """Snapshots (más recientes primero), opcionalmente de un solo directorio destino"""
+        if not os.path.isdir(self._index_dir):
+            return []
+
+        target_path = os.path.abspath(target_path) if target_path else None
+        snapshots = []
+        for name in os.listdir(self._index_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                info = SnapshotInfo.model_validate_json(Path(self._index_dir, name).read_bytes())
+            except (OSError, ValueError):
+                continue
+            if target_path is None or info.target_path == target_path:
+                snapshots.append(info)
+
+        snapshots.sort(key=lambda info: info.created_at, reverse=True)
+        return snapshots
+
+    def get(self, snapshot_id: str) -> SnapshotInfo:
+        path = os.path.join(self._index_dir, f"{os.path.basename(snapshot_id)}.json")
+        try:
+            return SnapshotInfo.model_validate_json(Path(path).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(f"Snapshot no encontrada: {snapshot_id}")
+
+    def read(self, snapshot_id: str, paths: Optional[List[str]] = None) -> Dict[str, bytes]:
+        """Contenidos de la snapshot (todos o solo las rutas indicadas)"""
+        info = self.get(snapshot_id)
+        selected = info.files if not paths else {
+            Path(path).as_posix(): info.files[Path(path).as_posix()]
+            for path in paths
+            if Path(path).as_posix() in info.files
+        }
+        contents = {}
+        for relative, content_hash in selected.items():
+            with gzip.open(self._object_path(content_hash), 'rb') as f:
+                contents[relative] = f.read()
+        return contents
+
+    async def restore(
+        self,
+        snapshot_id: str,
+        target_path: Optional[str] = None,
+        paths: Optional[List[str]] = None
+    ) -> List[str]:
+        """Restaura los archivos de una snapshot en un solo commit atómico
+
+        El estado actual de los archivos restaurados queda a su vez en una nueva snapshot.
+        """
+        info = self.get(snapshot_id)
+        contents = self.read(snapshot_id, paths)
+        if not contents:
+            return []
+
+        staged = StagedCommit(target_path or info.target_path, snapshots=self)
+        for relative, data in contents.items():
+            staged.add(relative, data, backup=True)
+        await staged.commit()
+
+        return [os.path.join(staged.target_path, relative) for relative in contents]
+
+    def prune(self, target_path: Optional[str] = None) -> Dict[str, int]:
+        """Aplica la retención por cantidad y antigüedad; elimina objetos sin referencias"""
+        removed = 0
+        cutoff = datetime.now() - timedelta(days=self.max_age_days) if self.max_age_days > 0 else None
+
+        with self._lock:
+            by_target: Dict[str, List[SnapshotInfo]] = {}
+            for info in self.list(target_path):
+                by_target.setdefault(info.target_path, []).append(info)
+
+            for snapshots in by_target.values():
+                for index, info in enumerate(snapshots):
+                    expired = cutoff is not None and datetime.fromisoformat(info.created_at) < cutoff
+                    if index >= self.keep or expired:
+                        try:
+                            os.remove(os.path.join(self._index_dir, f"{info.id}.json"))
+                            removed += 1
+                        except FileNotFoundError:
+                            pass
+
+            objects_removed = self._collect_garbage()
+
+        return {'snapshots_removed': removed, 'objects_removed': objects_removed}
+
+    def stats(self) -> Dict[str, int]:
+        objects = 0
+        stored_bytes = 0
+        if os.path.isdir(self._objects_dir):
+            for root, _, files in os.walk(self._objects_dir):
+                for name in files:
+                    objects += 1
+                    stored_bytes += os.path.getsize(os.path.join(root, name))
+        snapshots = self.list()
+        return {
+            'snapshots': len(snapshots),
+            'objects': objects,
+            'stored_bytes': stored_bytes,
+            'original_bytes': sum(info.size for info in snapshots)
+        }
+
+    def _store_object(self, data: bytes) -> str:
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._object_path(content_hash)
+        if os.path.exists(path):
+            # Renovar el mtime para que la recolección no lo considere huérfano
+            os.utime(path)
+        else:
+            _write_atomic(path, gzip.compress(data, compresslevel=6))
+        return content_hash
+
+    def _object_path(self, content_hash: str) -> str:
+        return os.path.join(self._objects_dir, content_hash[:2], f"{content_hash}.gz")
+
+    def _collect_garbage(self) -> int:
+        if not os.path.isdir(self._objects_dir):
+            return 0
+
+        referenced = {content_hash for info in self.list() for content_hash in info.files.values()}
+        threshold = time.time() - ORPHAN_GRACE_SECONDS
+        removed = 0
+        for root, _, files in os.walk(self._objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name[:-3] in referenced:
+                    continue
+                try:
+                    if os.path.getmtime(path) < threshold:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Administra las snapshots del generador CRUD')
+    parser.add_argument('--store', default=DEFAULT_SNAPSHOT_DIR, help='Directorio del almacén de snapshots')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help='Lista las snapshots')
+    list_parser.add_argument('--target', help='Solo snapshots de este directorio destino')
+
+    restore_parser = commands.add_parser('restore', help='Restaura una snapshot')
+    restore_parser.add_argument('snapshot_id')
+    restore_parser.add_argument('--target', help='Directorio donde restaurar (por defecto el original)')
+    restore_parser.add_argument('--file', action='append', dest='files', help='Ruta relativa a restaurar (repetible)')
+
+    prune_parser = commands.add_parser('prune', help='Aplica la retención')
+    prune_parser.add_argument('--target', help='Solo snapshots de este directorio destino')
+
+    args = parser.parse_args(argv)
+    store = SnapshotStore(args.store)
+
+    if args.command == 'list':
+        for info in store.list(args.target):
+            print(f"{info.id}  {info.created_at}  {len(info.files):>4} archivos  {info.target_path}")
+    elif args.command == 'restore':
+        try:
+            restored = asyncio.run(store.restore(args.snapshot_id, args.target, args.files))
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            return 1
+        for path in restored:
+            print(f"Restaurado: {path}")
+    elif args.command == 'prune':
+        print(json.dumps(store.prune(args.target)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,29 @@
 Utilidades para manejo de SQL Server
 """
 
-import pyodbc
+import os
 import re
+import xml.etree.ElementTree as ET
 from typing import Dict, List, Any, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+from metrics import PhaseTimer
+import progress
+import tracing
+from log_pipeline import Lazy
+
 logger = logging.getLogger(__name__)
+# Mensajes emitidos por cada query (muestreados por el pipeline de logging)
+query_logger = logging.getLogger(f"{__name__}.query")
+
+# Filas leídas por llamada a fetchmany (cada bloque emite un evento de progreso)
+FETCH_CHUNK_ROWS = int(os.getenv('SQL_FETCH_CHUNK_ROWS', '500'))
+
+def _pyodbc():
+    """pyodbc (y el driver manager ODBC) se carga en la primera conexión, no al importar"""
+    import pyodbc
+    return pyodbc
 
 class SqlValidator:
     """Validador de queries SQL para prevenir operaciones peligrosas"""
@@ -38,7 +52,7 @@ class SqlValidator:
     @classmethod
     def validate(cls, query: str) -> Dict[str, Any]:
         """Valida si una query SQL es segura"""
-        logger.info(f"Validando query: {query[:100]}...")
+        query_logger.info("Validando query: %.100s...", query)
         
         normalized_query = cls._normalize_query(query)
         
@@ -169,13 +183,267 @@ class SqlValidator:
         return statements[0].strip()
 
 
+class SqlTokenizer:
+    """Tokenizador léxico de T-SQL usado para normalizar queries"""
+    
+    TOKEN_PATTERN = re.compile(r"""
+        (?P<whitespace>\s+)
+      | (?P<comment>--[^\n]*|/\*[\s\S]*?\*/)
+      | (?P<string>N?'(?:[^']|'')*')
+      | (?P<number>0x[0-9A-Fa-f]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<identifier>\[[^\]]*\]|"[^"]*"|[@#]{0,2}[A-Za-z_][A-Za-z0-9_@$#]*)
+      | (?P<operator><>|!=|<=|>=|\|\||[-+*/%=<>!&|^~])
+      | (?P<punctuation>[(),.;])
+      | (?P<other>.)
+    """, re.VERBOSE)
+    
+    @classmethod
+    def tokenize(cls, query: str) -> List[Tuple[str, str]]:
+        """Divide una query en tokens (tipo, texto)"""
+        return [(match.lastgroup, match.group()) for match in cls.TOKEN_PATTERN.finditer(query)]
+    
+    @classmethod
+    def fingerprint(cls, query: str) -> str:
+        """Normaliza una query reemplazando literales por placeholders
+        
+        Ej: "select * from t where id = 5 and n in (1, 2)" -> "SELECT * FROM T WHERE ID = ? AND N IN (?+)"
+        (igual con "n in (1)": el largo de la lista no cambia el fingerprint)
+        """
+        parts: List[str] = []
+        for kind, text in cls.tokenize(query):
+            if kind in ('whitespace', 'comment'):
+                continue
+            if kind in ('string', 'number'):
+                # Literales negativos: "- 5" se normaliza igual que "5"
+                if parts and parts[-1] == '-' and (len(parts) < 2 or parts[-2] in ('(', ',', '=', '<', '>', '<=', '>=', '<>', '!=')):
+                    parts.pop()
+                parts.append('?')
+            elif kind == 'identifier' and text.startswith(('[', '"')):
+                parts.append(text[1:-1].upper())
+            else:
+                parts.append(text.upper())
+            
+            # Colapsar listas de placeholders de cualquier largo: (?) y (?, ?, ?) -> (?+)
+            if text == ')' and len(parts) >= 3 and parts[-2] in ('?', '?+'):
+                index = len(parts) - 2
+                while index >= 2 and parts[index - 1] == ',' and parts[index - 2] in ('?', '?+'):
+                    index -= 2
+                if parts[index - 1] == '(':
+                    parts[index:] = ['?+', ')']
+        
+        fingerprint = ' '.join(parts)
+        fingerprint = fingerprint.replace('( ', '(').replace(' )', ')').replace(' ,', ',').replace(' .', '.').replace('. ', '.')
+        # Colapsar las tuplas de VALUES: una o varias filas dan el mismo fingerprint
+        return re.sub(r'\bVALUES \(\?\+\)(?:, \(\?\+\))*', 'VALUES (?+)...', fingerprint)
+
+
+class SqlPlanAnalyzer:
+    """Captura y resume planes de ejecución (SHOWPLAN_XML) y estadísticas IO/TIME"""
+    
+    SHOWPLAN_NS = '{http://schemas.microsoft.com/sqlserver/2004/07/showplan}'
+    
+    # Número de operadores más costosos incluidos en el resumen
+    TOP_OPERATORS = 5
+    
+    # Límites a nivel de servidor (el request solo puede endurecerlos)
+    DEFAULT_MAX_ESTIMATED_COST = float(os.getenv('SQL_MAX_ESTIMATED_COST', '0')) or None
+    DEFAULT_MAX_ESTIMATED_ROWS = float(os.getenv('SQL_MAX_ESTIMATED_ROWS', '0')) or None
+    
+    IO_PATTERN = re.compile(r"Table '([^']+)'\. (.*)")
+    IO_COUNTER_PATTERN = re.compile(r'([a-z][a-z -]*?) (\d+)')
+    TIME_PATTERN = re.compile(r'CPU time = (\d+) ms,\s*elapsed time = (\d+) ms')
+    
+    @classmethod
+    def resolve_thresholds(
+        cls,
+        max_estimated_cost: Optional[float] = None,
+        max_estimated_rows: Optional[float] = None
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """Combina los límites del request con los del servidor (gana el más estricto)"""
+        def strictest(requested: Optional[float], default: Optional[float]) -> Optional[float]:
+            values = [v for v in (requested, default) if v is not None]
+            return min(values) if values else None
+        
+        return (
+            strictest(max_estimated_cost, cls.DEFAULT_MAX_ESTIMATED_COST),
+            strictest(max_estimated_rows, cls.DEFAULT_MAX_ESTIMATED_ROWS)
+        )
+    
+    @classmethod
+    def capture_estimated_plan(cls, cursor, query: str) -> Optional[str]:
+        """Obtiene el plan estimado en XML sin ejecutar la query"""
+        cursor.execute("SET SHOWPLAN_XML ON")
+        try:
+            cursor.execute(query)
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.execute("SET SHOWPLAN_XML OFF")
+    
+    @classmethod
+    def summarize_plan(cls, plan_xml: Optional[str]) -> Dict[str, Any]:
+        """Resume el plan: costo y filas estimadas, y los operadores más costosos"""
+        summary = {
+            'estimated_cost': None,
+            'estimated_rows': None,
+            'statement_type': None,
+            'operators': [],
+            'warnings': [],
+            'missing_indexes': 0
+        }
+        
+        if not plan_xml:
+            return summary
+        
+        try:
+            root = ET.fromstring(plan_xml)
+        except ET.ParseError as e:
+            summary['warnings'].append(f"No se pudo interpretar el plan: {str(e)}")
+            return summary
+        
+        ns = cls.SHOWPLAN_NS
+        statement = root.find(f'.//{ns}StmtSimple')
+        if statement is not None:
+            summary['estimated_cost'] = cls._to_float(statement.get('StatementSubTreeCost'))
+            summary['estimated_rows'] = cls._to_float(statement.get('StatementEstRows'))
+            summary['statement_type'] = statement.get('StatementType')
+        
+        operators = []
+        top_rel_op = root.find(f'.//{ns}RelOp')
+        if top_rel_op is not None:
+            cls._collect_operators(top_rel_op, operators)
+        
+        operators.sort(key=lambda op: op['own_cost'], reverse=True)
+        summary['operators'] = operators[:cls.TOP_OPERATORS]
+        
+        for warnings in root.iter(f'{ns}Warnings'):
+            for warning in warnings:
+                summary['warnings'].append(warning.tag.replace(ns, ''))
+        
+        summary['missing_indexes'] = sum(1 for _ in root.iter(f'{ns}MissingIndex'))
+        
+        return summary
+    
+    @classmethod
+    def _collect_operators(cls, rel_op: ET.Element, operators: List[Dict[str, Any]]) -> float:
+        """Recorre el árbol de RelOp calculando el costo propio de cada operador"""
+        children = cls._child_rel_ops(rel_op)
+        subtree_cost = cls._to_float(rel_op.get('EstimatedTotalSubtreeCost')) or 0.0
+        children_cost = sum(cls._collect_operators(child, operators) for child in children)
+        
+        operators.append({
+            'node_id': rel_op.get('NodeId'),
+            'physical_op': rel_op.get('PhysicalOp'),
+            'logical_op': rel_op.get('LogicalOp'),
+            'estimated_rows': cls._to_float(rel_op.get('EstimateRows')),
+            'subtree_cost': subtree_cost,
+            'own_cost': max(subtree_cost - children_cost, 0.0)
+        })
+        
+        return subtree_cost
+    
+    @classmethod
+    def _child_rel_ops(cls, rel_op: ET.Element) -> List[ET.Element]:
+        """Obtiene los RelOp hijos directos (anidados dentro del elemento del operador)"""
+        children = []
+        pending = list(rel_op)
+        while pending:
+            element = pending.pop(0)
+            if element.tag == f'{cls.SHOWPLAN_NS}RelOp':
+                children.append(element)
+            else:
+                pending.extend(element)
+        return children
+    
+    @classmethod
+    def check_thresholds(
+        cls,
+        plan: Dict[str, Any],
+        max_estimated_cost: Optional[float],
+        max_estimated_rows: Optional[float]
+    ) -> Optional[str]:
+        """Retorna un mensaje de rechazo si el plan excede los límites configurados"""
+        cost = plan.get('estimated_cost')
+        rows = plan.get('estimated_rows')
+        
+        if max_estimated_cost is not None and cost is not None and cost > max_estimated_cost:
+            return f"Query rechazada: costo estimado {cost:.4f} excede el máximo permitido {max_estimated_cost}"
+        
+        if max_estimated_rows is not None and rows is not None and rows > max_estimated_rows:
+            return f"Query rechazada: filas estimadas {rows:.0f} exceden el máximo permitido {max_estimated_rows:.0f}"
+        
+        return None
+    
+    @classmethod
+    def enable_statistics(cls, cursor) -> None:
+        """Activa SET STATISTICS IO/TIME para la sesión"""
+        cursor.execute("SET STATISTICS IO ON")
+        cursor.execute("SET STATISTICS TIME ON")
+    
+    @classmethod
+    def collect_statistics(cls, cursor) -> Dict[str, Any]:
+        """Lee los mensajes informativos del cursor y extrae estadísticas IO/TIME"""
+        messages = list(getattr(cursor, 'messages', None) or [])
+        try:
+            while cursor.nextset():
+                messages.extend(getattr(cursor, 'messages', None) or [])
+        except _pyodbc().Error:
+            pass
+        
+        return cls.parse_statistics([message[1] for message in messages])
+    
+    @classmethod
+    def parse_statistics(cls, messages: List[str]) -> Dict[str, Any]:
+        """Interpreta los mensajes de STATISTICS IO y STATISTICS TIME"""
+        io = {}
+        parse_cpu_ms = parse_elapsed_ms = 0
+        cpu_ms = elapsed_ms = 0
+        
+        for message in messages:
+            text = message.split('[SQL Server]')[-1]
+            
+            io_match = cls.IO_PATTERN.search(text)
+            if io_match:
+                table = io_match.group(1)
+                counters = io.setdefault(table, {})
+                for name, value in cls.IO_COUNTER_PATTERN.findall(io_match.group(2).lower()):
+                    key = name.strip().replace(' ', '_').replace('-', '_')
+                    counters[key] = counters.get(key, 0) + int(value)
+                continue
+            
+            for cpu, elapsed in cls.TIME_PATTERN.findall(text):
+                if 'parse and compile' in text:
+                    parse_cpu_ms += int(cpu)
+                    parse_elapsed_ms += int(elapsed)
+                else:
+                    cpu_ms += int(cpu)
+                    elapsed_ms += int(elapsed)
+        
+        return {
+            'io': io,
+            'time': {
+                'parse_compile_cpu_ms': parse_cpu_ms,
+                'parse_compile_elapsed_ms': parse_elapsed_ms,
+                'execution_cpu_ms': cpu_ms,
+                'execution_elapsed_ms': elapsed_ms
+            }
+        }
+    
+    @staticmethod
+    def _to_float(value: Optional[str]) -> Optional[float]:
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+
 class SqlConnection:
     """Manejo de conexiones SQL Server"""
     
     @classmethod
     def parse_connection_string(cls, connection_string: str) -> Dict[str, Any]:
         """Parsea una cadena de conexión SQL Server"""
-        logger.info("Parseando cadena de conexión")
+        query_logger.debug("Parseando cadena de conexión")
         
         config = {
             'driver': '{ODBC Driver 17 for SQL Server}',
@@ -227,29 +495,88 @@ class SqlConnection:
                 parts.append(f"{key}={value}")
         
         odbc_string = ';'.join(parts)
-        logger.info(f"Cadena ODBC construida: {odbc_string.replace(config.get('pwd', ''), '***')}")
+        if query_logger.isEnabledFor(logging.DEBUG):
+            query_logger.debug("Cadena ODBC construida: %s", cls._mask_password(odbc_string, config.get('pwd', '')))
         return odbc_string
     
+    @staticmethod
+    def _mask_password(odbc_string: str, password: str) -> str:
+        return odbc_string.replace(password, '***') if password else odbc_string
+    
     @classmethod
-    def execute_query(cls, connection_string: str, query: str, max_rows: int = 1000) -> Dict[str, Any]:
-        """Ejecuta una query SQL"""
-        logger.info(f"Ejecutando query tipo: {SqlValidator._detect_query_type(SqlValidator._normalize_query(query))}")
+    def execute_query(
+        cls,
+        connection_string: str,
+        query: str,
+        max_rows: int = 1000,
+        analyze: bool = False,
+        max_estimated_cost: Optional[float] = None,
+        max_estimated_rows: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Ejecuta una query SQL
+        
+        Con analyze=True captura el plan estimado y las estadísticas IO/TIME.
+        Si hay límites de costo o filas, el plan estimado se evalúa antes de ejecutar
+        y la query se rechaza sin llegar a correr.
+        El resultado incluye 'timings' con la duración en ms de cada fase
+        (prepare, connect, session_setup, plan, execute, fetch, close).
+        """
+        query_logger.info(
+            "Ejecutando query tipo: %s",
+            Lazy(lambda: SqlValidator._detect_query_type(SqlValidator._normalize_query(query)))
+        )
+        
+        timer = PhaseTimer(report=True, trace='sql')
         
         try:
             config = cls.parse_connection_string(connection_string)
             odbc_string = cls.build_odbc_string(config)
+            timer.lap('prepare')
             
             # Conectar
-            logger.info("Estableciendo conexión a SQL Server")
-            conn = pyodbc.connect(odbc_string, timeout=config['timeout'])
+            query_logger.debug("Estableciendo conexión a SQL Server")
+            conn = _pyodbc().connect(odbc_string, timeout=config['timeout'])
             cursor = conn.cursor()
+            timer.lap('connect')
             
             # Configurar opciones de seguridad
             cursor.execute("SET ARITHABORT ON")
+            timer.lap('session_setup')
+            
+            # Plan estimado y control de costo (antes de ejecutar)
+            plan = None
+            max_cost, max_rows_estimate = SqlPlanAnalyzer.resolve_thresholds(
+                max_estimated_cost, max_estimated_rows
+            )
+            if analyze or max_cost is not None or max_rows_estimate is not None:
+                plan = SqlPlanAnalyzer.summarize_plan(
+                    SqlPlanAnalyzer.capture_estimated_plan(cursor, query)
+                )
+                rejection = SqlPlanAnalyzer.check_thresholds(plan, max_cost, max_rows_estimate)
+                timer.lap('plan')
+                if rejection:
+                    logger.warning(rejection)
+                    cursor.close()
+                    conn.close()
+                    timer.lap('close')
+                    return {
+                        'success': False,
+                        'rejected': True,
+                        'error': rejection,
+                        'plan': plan,
+                        'data': [],
+                        'columns': [],
+                        'timings': timer.as_dict()
+                    }
+            
+            if analyze:
+                SqlPlanAnalyzer.enable_statistics(cursor)
+                timer.lap('session_setup')
             
             # Ejecutar query
-            logger.info("Ejecutando query")
+            query_logger.debug("Ejecutando query")
             cursor.execute(query)
+            timer.lap('execute')
             
             result = {
                 'success': True,
@@ -263,27 +590,47 @@ class SqlConnection:
                 # Obtener nombres de columnas
                 result['columns'] = [column[0] for column in cursor.description]
                 
-                # Obtener datos (limitados)
-                rows = cursor.fetchmany(max_rows)
-                result['data'] = [list(row) for row in rows]
+                # Obtener datos (limitados) por bloques, reportando el avance
+                data = result['data']
+                while len(data) < max_rows:
+                    rows = cursor.fetchmany(min(FETCH_CHUNK_ROWS, max_rows - len(data)))
+                    if not rows:
+                        break
+                    data.extend(list(row) for row in rows)
+                    progress.report('rows', fetched=len(data), max_rows=max_rows)
+                timer.lap('fetch')
+                tracing.annotate(rows=len(data))
                 
-                logger.info(f"Query ejecutada exitosamente. Filas obtenidas: {len(result['data'])}")
+                query_logger.info("Query ejecutada exitosamente. Filas obtenidas: %d", len(result['data']))
             else:
-                logger.info(f"Query ejecutada exitosamente. Filas afectadas: {result['rows_affected']}")
+                query_logger.info("Query ejecutada exitosamente. Filas afectadas: %s", result['rows_affected'])
+            
+            if analyze:
+                plan['statistics'] = SqlPlanAnalyzer.collect_statistics(cursor)
+                timer.lap('plan')
+            
+            if plan is not None:
+                result['plan'] = plan
             
             # Cerrar conexión
             cursor.close()
             conn.close()
+            timer.lap('close')
             
+            result['timings'] = timer.as_dict()
             return result
             
         except Exception as e:
-            logger.error(f"Error ejecutando query: {str(e)}")
+            # Tiempo consumido por la fase que falló
+            timer.lap('failed')
+            tracing.fail(str(e))
+            logger.error("Error ejecutando query: %s", e)
             return {
                 'success': False,
                 'error': str(e),
                 'data': [],
-                'columns': []
+                'columns': [],
+                'timings': timer.as_dict()
             }
     
     @classmethod
@@ -295,7 +642,7 @@ class SqlConnection:
             config = cls.parse_connection_string(connection_string)
             odbc_string = cls.build_odbc_string(config)
             
-            conn = pyodbc.connect(odbc_string, timeout=config['timeout'])
+            conn = _pyodbc().connect(odbc_string, timeout=config['timeout'])
             cursor = conn.cursor()
             
             # Información básica
@@ -321,11 +668,11 @@ class SqlConnection:
             cursor.close()
             conn.close()
             
-            logger.info(f"Información obtenida para BD: {result['database_name']}")
+            logger.info("Información obtenida para BD: %s", result['database_name'])
             return result
             
         except Exception as e:
-            logger.error(f"Error obteniendo información de BD: {str(e)}")
+            logger.error("Error obteniendo información de BD: %s", e)
             raise e
     
     @classmethod
@@ -337,7 +684,7 @@ class SqlConnection:
             config = cls.parse_connection_string(connection_string)
             odbc_string = cls.build_odbc_string(config)
             
-            conn = pyodbc.connect(odbc_string, timeout=config['timeout'])
+            conn = _pyodbc().connect(odbc_string, timeout=config['timeout'])
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -352,17 +699,17 @@ class SqlConnection:
             cursor.close()
             conn.close()
             
-            logger.info(f"Tablas encontradas: {len(tables)}")
+            logger.info("Tablas encontradas: %d", len(tables))
             return tables
             
         except Exception as e:
-            logger.error(f"Error obteniendo tablas: {str(e)}")
+            logger.error("Error obteniendo tablas: %s", e)
             raise e
     
     @classmethod
     def get_table_structure(cls, connection_string: str, table_name: str) -> List[Dict[str, Any]]:
         """Obtiene la estructura de una tabla"""
-        logger.info(f"Obteniendo estructura de tabla: {table_name}")
+        logger.info("Obteniendo estructura de tabla: %s", table_name)
         
         # Sanitizar nombre de tabla
         safe_table_name = re.sub(r'[^a-zA-Z0-9_]', '', table_name)
@@ -371,7 +718,7 @@ class SqlConnection:
             config = cls.parse_connection_string(connection_string)
             odbc_string = cls.build_odbc_string(config)
             
-            conn = pyodbc.connect(odbc_string, timeout=config['timeout'])
+            conn = _pyodbc().connect(odbc_string, timeout=config['timeout'])
             cursor = conn.cursor()
             
             cursor.execute(f"""
@@ -403,9 +750,9 @@ class SqlConnection:
             cursor.close()
             conn.close()
             
-            logger.info(f"Estructura obtenida para {table_name}: {len(columns)} columnas")
+            logger.info("Estructura obtenida para %s: %d columnas", table_name, len(columns))
             return columns
             
         except Exception as e:
-            logger.error(f"Error obteniendo estructura de {table_name}: {str(e)}")
+            logger.error("Error obteniendo estructura de %s: %s", table_name, e)
             raise e
\ No newline at end of file
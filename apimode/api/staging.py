@@ -0,0 +1,183 @@
+"""
+Commit atómico de archivos generados: se escriben en un directorio de staging
+dentro del destino (mismo sistema de archivos) y se publican con renames
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from snapshots import SnapshotStore
+
+STAGING_PREFIX = '.mcp-staging-'
+
+# Directorios de staging más antiguos que esto quedaron de un proceso interrumpido
+# (uno más reciente puede ser un commit en curso de otro worker)
+STALE_STAGING_SECONDS = 3600
+
+
+class StagedCommit:
+    """Acumula las salidas de una generación y las publica en un solo paso
+
+    Antes de reemplazar un archivo existente se crea un hardlink a su versión
+    anterior; si algún rename falla, los archivos ya publicados se restauran
+    desde esos enlaces, de modo que el módulo nunca queda a medio escribir.
+    Las versiones anteriores de los archivos marcados con backup se guardan en
+    una única snapshot de la ejecución, fuera del directorio destino.
+    """
+
+    def __init__(self, target_path: str, snapshots: Optional['SnapshotStore'] = None):
+        self.target_path = os.path.abspath(target_path)
+        self.snapshots = snapshots
+        self._files: List[Tuple[str, bytes, bool]] = []
+
+    def add(self, file_path: str, content: Union[str, bytes], backup: bool = False) -> None:
+        """Agrega un archivo (ruta absoluta o relativa al destino) al commit"""
+        relative = os.path.relpath(os.path.join(self.target_path, file_path), self.target_path)
+        if relative.startswith(os.pardir):
+            raise ValueError(f"Ruta fuera del directorio destino: {file_path}")
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self._files.append((relative, content, backup))
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    @property
+    def size(self) -> int:
+        """Bytes a publicar"""
+        return sum(len(data) for _, data, _ in self._files)
+
+    async def commit(self) -> Optional[str]:
+        """Publica todos los archivos; retorna el id de la snapshot de backup (si hubo)"""
+        if not self._files:
+            return None
+        return await asyncio.to_thread(self._commit_sync)
+
+    def _commit_sync(self) -> Optional[str]:
+        # Directorios del destino creados por este commit (se eliminan si se revierte)
+        created_dirs: List[str] = []
+        _make_dirs(self.target_path, created_dirs)
+        _remove_stale_staging(self.target_path)
+        staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.target_path)
+        staged_root = os.path.join(staging, 'files')
+        previous_root = os.path.join(staging, 'previous')
+        known_dirs: Set[str] = set()
+
+        def ensure_dir(path: str, created: Optional[List[str]] = None) -> None:
+            if path not in known_dirs:
+                _make_dirs(path, created)
+                known_dirs.add(path)
+
+        replaced: List[Tuple[str, Optional[str]]] = []
+        try:
+            # 1. Escribir todo en staging
+            for relative, data, _ in self._files:
+                staged = os.path.join(staged_root, relative)
+                ensure_dir(os.path.dirname(staged))
+                with open(staged, 'wb') as f:
+                    f.write(data)
+
+            # 2. Publicar con renames, conservando un enlace a cada versión anterior
+            for relative, _, _ in self._files:
+                live = os.path.join(self.target_path, relative)
+                previous = os.path.join(previous_root, relative)
+                ensure_dir(os.path.dirname(live), created_dirs)
+                ensure_dir(os.path.dirname(previous))
+
+                if not _link_or_copy(live, previous):
+                    previous = None
+
+                os.replace(os.path.join(staged_root, relative), live)
+                replaced.append((live, previous))
+
+        except BaseException:
+            # Restaurar lo ya publicado
+            for live, previous in reversed(replaced):
+                try:
+                    if previous:
+                        os.replace(previous, live)
+                    else:
+                        os.remove(live)
+                except OSError:
+                    pass
+            shutil.rmtree(staging, ignore_errors=True)
+            # Los más profundos primero; rmdir no borra directorios que tengan otro contenido
+            for path in reversed(created_dirs):
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    pass
+            raise
+
+        try:
+            return self._keep_backups(previous_root)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _keep_backups(self, previous_root: str) -> Optional[str]:
+        """Guarda las versiones anteriores de los archivos con backup en una snapshot"""
+        if self.snapshots is None:
+            return None
+
+        backups = {
+            relative: os.path.join(previous_root, relative)
+            for relative, _, backup in self._files
+            if backup and os.path.exists(os.path.join(previous_root, relative))
+        }
+        if not backups:
+            return None
+        return self.snapshots.create(self.target_path, backups).id
+
+
+def _make_dirs(path: str, created: Optional[List[str]] = None) -> None:
+    """os.makedirs que agrega a created los directorios que no existían (de arriba hacia abajo)"""
+    if created is None:
+        os.makedirs(path, exist_ok=True)
+        return
+    missing = []
+    while path and not os.path.isdir(path):
+        missing.append(path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    for path in reversed(missing):
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            continue
+        created.append(path)
+
+
+def _remove_stale_staging(target_path: str) -> None:
+    """Elimina directorios de staging abandonados por un proceso terminado a la fuerza"""
+    cutoff = time.time() - STALE_STAGING_SECONDS
+    try:
+        entries = list(os.scandir(target_path))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.startswith(STAGING_PREFIX) and entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _link_or_copy(source: str, destination: str) -> bool:
+    """Hardlink (o copia si el sistema de archivos no lo permite); False si source no existe"""
+    try:
+        os.link(source, destination)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            shutil.copy2(source, destination)
+        except FileNotFoundError:
+            return False
+    return True
@@ -0,0 +1,51 @@
+"""
+Respuestas JSON precalculadas: se codifican una sola vez y se sirven con
+ETag fuerte, Cache-Control y 304 en peticiones condicionales (solo GET/HEAD)
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+DEFAULT_MAX_AGE = int(os.getenv('STATIC_RESPONSE_MAX_AGE', '3600'))
+
+
+class PrecomputedResponse:
+    """Cuerpo JSON ya codificado junto con su ETag"""
+
+    __slots__ = ('body', 'etag', 'cache_control')
+
+    def __init__(self, payload: Any, max_age: int = DEFAULT_MAX_AGE):
+        if isinstance(payload, BaseModel):
+            self.body = payload.model_dump_json().encode('utf-8')
+        else:
+            self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.cache_control = f"public, max-age={max_age}"
+
+    def respond(self, request: Optional[Request] = None) -> Response:
+        """Respuesta completa, o 304 si un GET/HEAD ya tiene esta versión"""
+        if request is not None and request.method not in ('GET', 'HEAD'):
+            # Solo GET/HEAD son cacheables; un POST no debe guardarse en caches compartidos
+            return Response(content=self.body, media_type='application/json', headers={'Cache-Control': 'no-store'})
+        headers = {'ETag': self.etag, 'Cache-Control': self.cache_control}
+        if request is not None and etag_matches(request.headers.get('if-none-match'), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type='application/json', headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): acepta '*' y listas"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(
+        candidate.strip().removeprefix('W/') == etag
+        for candidate in if_none_match.split(',')
+    )
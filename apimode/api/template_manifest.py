@@ -0,0 +1,133 @@
+"""
+Manifiesto indexado de templates: se construye una vez y se refresca por mtime
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+TEMPLATE_SUFFIX = '.template'
+
+
+class TemplateEntry(BaseModel):
+    """Metadatos de un template del manifiesto"""
+    name: str  # Ruta relativa (posix), usada también como nombre en el loader de Jinja
+    path: str  # Ruta absoluta del template
+    output_pattern: str  # Ruta relativa de salida con placeholders ([Entity], ...) sin resolver
+    file_type: str  # Tipo de archivo generado (component, page, api...)
+    content_hash: str  # sha256 del contenido del template
+    size: int
+    mtime_ns: int
+
+
+class TemplateManifest:
+    """Índice de los templates disponibles
+
+    Reemplaza el escaneo recursivo por request: el árbol se recorre al construir
+    el manifiesto y luego solo se verifica (como máximo cada refresh_interval
+    segundos) el mtime de los directorios y archivos conocidos.
+    """
+
+    def __init__(
+        self,
+        templates_path: str,
+        resolve_output: Callable[[str], str],
+        get_file_type: Callable[[str], str],
+        refresh_interval: float = 2.0
+    ):
+        self.templates_path = templates_path
+        self.refresh_interval = refresh_interval
+        self._resolve_output = resolve_output
+        self._get_file_type = get_file_type
+        self._entries: List[TemplateEntry] = []
+        self._signature: Dict[str, int] = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.build_count = 0
+        self.set_hash = ''
+        self.rebuild()
+
+    def entries(self) -> List[TemplateEntry]:
+        """Templates ordenados por nombre, refrescando si hubo cambios en disco"""
+        now = time.monotonic()
+        if now - self._last_check >= self.refresh_interval:
+            self._last_check = now
+            if self._current_signature(self._signature) != self._signature:
+                self.rebuild()
+        return self._entries
+
+    def get(self, name: str) -> Optional[TemplateEntry]:
+        for entry in self.entries():
+            if entry.name == name:
+                return entry
+        return None
+
+    def rebuild(self) -> None:
+        """Recorre el árbol de templates y reconstruye el índice"""
+        with self._lock:
+            entries = []
+            signature = {}
+
+            if not os.path.isdir(self.templates_path):
+                # Detectar si el directorio aparece más adelante
+                signature[self.templates_path] = -1
+            else:
+                for root, dirs, files in os.walk(self.templates_path):
+                    dirs.sort()
+                    signature[root] = os.stat(root).st_mtime_ns
+                    for filename in sorted(files):
+                        if not filename.endswith(TEMPLATE_SUFFIX):
+                            continue
+                        path = os.path.join(root, filename)
+                        entries.append(self._build_entry(path))
+                        signature[path] = entries[-1].mtime_ns
+
+            entries.sort(key=lambda entry: entry.name)
+            self._entries = entries
+            self._signature = signature
+            self._last_check = time.monotonic()
+            self.set_hash = hashlib.sha256(
+                ''.join(f"{entry.name}:{entry.content_hash};" for entry in entries).encode('utf-8')
+            ).hexdigest()
+            self.build_count += 1
+
+    def _build_entry(self, path: str) -> TemplateEntry:
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+
+        name = Path(os.path.relpath(path, self.templates_path)).as_posix()
+        output_pattern = self._resolve_output(name)
+
+        return TemplateEntry(
+            name=name,
+            path=path,
+            output_pattern=output_pattern,
+            file_type=self._get_file_type('/' + output_pattern),
+            content_hash=content_hash,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns
+        )
+
+    @staticmethod
+    def _current_signature(known: Dict[str, int]) -> Dict[str, int]:
+        """mtime actual de cada ruta conocida (-1 si ya no existe)"""
+        signature = {}
+        for path in known:
+            try:
+                signature[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                signature[path] = -1
+        return signature
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            'templates': len(self._entries),
+            'set_hash': self.set_hash,
+            'builds': self.build_count
+        }
@@ -0,0 +1,325 @@
+"""
+Trazas ligeras (spans) de las peticiones, la generación y la ejecución SQL
+
+El span activo viaja en un ContextVar (como los eventos de progress), de modo
+que los spans creados en tareas de asyncio.gather o en hilos lanzados con
+asyncio.to_thread / run_in_threadpool quedan como hijos del que los originó.
+Cuando termina el span raíz local, la traza completa pasa a un buffer circular
+en memoria y, si se configuró, se agrega como una línea JSON en formato OTLP
+(ExportTraceServiceRequest) al archivo de exportación.
+
+Configuración por variables de entorno:
+    TRACING                 0 para desactivar las trazas (por defecto 1)
+    TRACE_BUFFER_TRACES     Trazas conservadas en memoria (por defecto 200)
+    TRACE_MAX_SPANS         Spans por traza; los siguientes se descartan (por defecto 2000)
+    TRACE_EXPORT_FILE       Archivo JSONL donde exportar cada traza terminada
+    TRACE_SERVICE_NAME      service.name del recurso OTLP (por defecto mcp-creator-api)
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv('TRACING', '1') == '1'
+DEFAULT_BUFFER_TRACES = int(os.getenv('TRACE_BUFFER_TRACES', '200'))
+DEFAULT_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', '2000'))
+DEFAULT_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE') or None
+SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'mcp-creator-api')
+
+# SpanKind de OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+# StatusCode de OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+
+class Span:
+    """Operación con inicio, fin, atributos y un padre opcional"""
+
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'remote_parent', 'name', 'kind',
+        'start_ns', 'end_ns', 'attributes', 'status', 'status_message'
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        remote_parent: bool = False,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None
+    ):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.remote_parent = remote_parent
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+        self.status_message: Optional[str] = None
+
+    @property
+    def is_local_root(self) -> bool:
+        return self.parent_id is None or self.remote_parent
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def fail(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or self.start_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            'status': {'code': self.status}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    """Agrupa los spans por traza y conserva las últimas trazas terminadas"""
+
+    def __init__(
+        self,
+        enabled: bool = TRACING_ENABLED,
+        max_traces: int = DEFAULT_BUFFER_TRACES,
+        max_spans: int = DEFAULT_MAX_SPANS,
+        export_file: Optional[str] = DEFAULT_EXPORT_FILE
+    ):
+        self.enabled = enabled
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self.export_file = export_file
+        self.dropped_spans = 0
+        self._pending: 'OrderedDict[str, List[Span]]' = OrderedDict()
+        self._traces: 'OrderedDict[str, List[Span]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._export_queue: Optional[queue.SimpleQueue] = None
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        remote: Optional[Tuple[str, str]] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        start_ns: Optional[int] = None,
+        **attributes: Any
+    ) -> Span:
+        """Nuevo span hijo de parent, del contexto remoto (trace id, span id) o raíz"""
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, kind=kind, attributes=attributes, start_ns=start_ns)
+        if remote is not None:
+            return Span(name, remote[0], remote[1], remote_parent=True, kind=kind, attributes=attributes, start_ns=start_ns)
+        return Span(name, f"{random.getrandbits(128):032x}", kind=kind, attributes=attributes, start_ns=start_ns)
+
+    def finish(self, span: Span, end_ns: Optional[int] = None) -> None:
+        span.end_ns = end_ns or time.time_ns()
+        completed = None
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._pending.get(span.trace_id)
+                if spans is None:
+                    spans = self._pending[span.trace_id] = []
+                    # Raíces que nunca terminan no deben acumularse
+                    while len(self._pending) > self.max_traces:
+                        self._pending.popitem(last=False)
+            if len(spans) < self.max_spans:
+                spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+            if span.is_local_root and span.trace_id in self._pending:
+                completed = self._pending.pop(span.trace_id)
+                self._traces[span.trace_id] = completed
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+
+        if completed is not None and self.export_file:
+            self._export(completed)
+
+    def traces(self, min_ms: float = 0, name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Resumen de las trazas terminadas (más recientes primero)"""
+        with self._lock:
+            traces = [list(spans) for spans in reversed(self._traces.values())]
+
+        summaries = []
+        for spans in traces:
+            root = next((span for span in spans if span.is_local_root), spans[-1])
+            if root.duration_ms < min_ms or (name and name not in root.name):
+                continue
+            summaries.append({
+                'trace_id': root.trace_id,
+                'name': root.name,
+                'start_time': root.start_ns // 1000000,
+                'duration_ms': round(root.duration_ms, 3),
+                'spans': len(spans),
+                'errors': sum(1 for span in spans if span.status == STATUS_ERROR),
+                'attributes': root.attributes
+            })
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+    def get(self, trace_id: str) -> Dict[str, Any]:
+        """Traza terminada en formato OTLP JSON"""
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                raise KeyError(f"Traza no encontrada: {trace_id}")
+            spans = list(spans)
+        return self._to_otlp(spans)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'traces': len(self._traces),
+                'pending': len(self._pending),
+                'max_traces': self.max_traces,
+                'dropped_spans': self.dropped_spans,
+                'export_file': self.export_file
+            }
+
+    @staticmethod
+    def _to_otlp(spans: List[Span]) -> Dict[str, Any]:
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+                'scopeSpans': [{
+                    'scope': {'name': 'mcp-creator'},
+                    'spans': [span.to_otlp() for span in sorted(spans, key=lambda span: span.start_ns)]
+                }]
+            }]
+        }
+
+    def _export(self, spans: List[Span]) -> None:
+        # La escritura al archivo no debe ocurrir en el event loop
+        if self._export_queue is None:
+            with self._lock:
+                if self._export_queue is None:
+                    self._export_queue = queue.SimpleQueue()
+                    threading.Thread(target=self._export_worker, name='trace-exporter', daemon=True).start()
+        self._export_queue.put(spans)
+
+    def _export_worker(self) -> None:
+        while True:
+            spans = self._export_queue.get()
+            try:
+                line = json.dumps(self._to_otlp(spans), separators=(',', ':'))
+                with open(self.export_file, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except (OSError, TypeError, ValueError):
+                logger.exception("No se pudo exportar la traza a %s", self.export_file)
+
+
+tracer = Tracer()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+@contextmanager
+def span(name: str, remote: Optional[Tuple[str, str]] = None, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Ejecuta el bloque dentro de un span hijo del activo (None si las trazas están desactivadas)"""
+    if not tracer.enabled:
+        yield None
+        return
+
+    current = tracer.start_span(name, parent=_current_span.get(), remote=remote, kind=kind, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(str(e) or type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(current)
+
+
+def annotate(**attributes: Any) -> None:
+    """Agrega atributos al span activo (sin efecto si no hay ninguno)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def fail(message: str) -> None:
+    """Marca el span activo como fallido (sin efecto si no hay ninguno)"""
+    current = _current_span.get()
+    if current is not None:
+        current.fail(message)
+
+
+def record(name: str, duration_ms: float, **attributes: Any) -> None:
+    """Registra como hijo del span activo una operación ya terminada que duró duration_ms"""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    tracer.finish(
+        tracer.start_span(name, parent=parent, start_ns=end_ns - int(duration_ms * 1e6), **attributes),
+        end_ns=end_ns
+    )
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace id, span id) de una cabecera W3C traceparent válida"""
+    match = TRACEPARENT_PATTERN.match(header.strip().lower()) if header else None
+    if match is None or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2)
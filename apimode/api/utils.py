@@ -6,11 +6,15 @@ import re
 import os
 import json
 import shutil
+import stat
 import glob
-from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-import sys
+import logging
+import aiofiles
+import aiofiles.os
+
+import progress
 
 class StringUtils:
     """Convierte un string a diferentes formatos de nomenclatura"""
@@ -65,23 +69,49 @@ class StringUtils:
         """Convierte la primera letra a minúscula"""
         return s[0].lower() + s[1:] if s else ""
 
+# Copia con metadatos ejecutada en el executor de aiofiles
+_copy2 = aiofiles.os.wrap(shutil.copy2)
+
 class FileUtils:
-    """Utilidades para manejo de archivos"""
+    """Utilidades para manejo de archivos (E/S sin bloquear el event loop vía aiofiles)"""
     
     @staticmethod
     async def can_write_to_directory(dir_path: str) -> bool:
         """Verifica si un directorio existe y tiene permisos de escritura"""
         try:
-            path = Path(dir_path)
-            path.mkdir(parents=True, exist_ok=True)
-            return os.access(path, os.W_OK)
+            await aiofiles.os.makedirs(dir_path, exist_ok=True)
+            return await aiofiles.os.access(dir_path, os.W_OK)
         except:
             return False
     
     @staticmethod
     async def ensure_directory(dir_path: str) -> None:
         """Crea un directorio si no existe"""
-        Path(dir_path).mkdir(parents=True, exist_ok=True)
+        await aiofiles.os.makedirs(dir_path, exist_ok=True)
+    
+    @staticmethod
+    def ensure_private_directory(dir_path: str) -> str:
+        """Crea (o valida) un directorio accesible solo por el usuario actual (síncrono)
+        
+        En rutas compartidas como /tmp otro usuario puede crear el directorio
+        primero: se rechaza si no es del usuario actual o si el grupo u otros
+        pueden escribir en él. Si solo pueden leerlo, se restringe a 0700.
+        """
+        os.makedirs(dir_path, mode=0o700, exist_ok=True)
+        if not hasattr(os, 'getuid'):
+            # Windows: sin dueño ni modo POSIX que verificar
+            return dir_path
+        
+        info = os.lstat(dir_path)
+        if not stat.S_ISDIR(info.st_mode):
+            raise PermissionError(f"{dir_path} no es un directorio")
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{dir_path} pertenece a otro usuario (uid {info.st_uid})")
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"{dir_path} tiene permisos de escritura para el grupo u otros")
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.chmod(dir_path, 0o700)
+        return dir_path
     
     @staticmethod
     async def copy_and_replace(
@@ -90,17 +120,25 @@ class FileUtils:
         replacements: Dict[str, str]
     ) -> None:
         """Copia un archivo y reemplaza variables en el contenido"""
-        with open(source_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = await FileUtils.read_text(source_path)
         
         for key, value in replacements.items():
             content = content.replace(f"{{{{{key}}}}}", value)
         
-        target = Path(target_path)
-        target.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(target_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        await FileUtils.write_text(target_path, content)
+    
+    @staticmethod
+    async def read_text(file_path: str) -> str:
+        """Lee un archivo de texto sin bloquear el event loop"""
+        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+            return await f.read()
+    
+    @staticmethod
+    async def write_text(file_path: str, content: str) -> None:
+        """Escribe un archivo de texto (creando el directorio) sin bloquear el event loop"""
+        await FileUtils.ensure_directory(os.path.dirname(file_path) or '.')
+        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+            await f.write(content)
     
     @staticmethod
     async def find_files(pattern: str, cwd: Optional[str] = None) -> List[str]:
@@ -113,49 +151,59 @@ class FileUtils:
     async def read_json(file_path: str) -> Optional[Dict[str, Any]]:
         """Lee un archivo JSON de forma segura"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json.loads(await FileUtils.read_text(file_path))
         except:
             return None
     
     @staticmethod
     async def write_json(file_path: str, data: Any, indent: int = 2) -> None:
         """Escribe un archivo JSON con formato"""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=indent, ensure_ascii=False)
+        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(data, indent=indent, ensure_ascii=False))
     
     @staticmethod
     async def exists(file_path: str) -> bool:
         """Verifica si un archivo existe"""
-        return Path(file_path).exists()
+        return await aiofiles.os.path.exists(file_path)
     
     @staticmethod
     async def get_file_size(file_path: str) -> int:
         """Obtiene el tamaño de un archivo en bytes"""
-        return Path(file_path).stat().st_size
+        return await aiofiles.os.path.getsize(file_path)
     
     @staticmethod
     async def create_backup(file_path: str) -> Optional[str]:
         """Crea un backup de un archivo si existe"""
-        path = Path(file_path)
-        if not path.exists():
+        if not await aiofiles.os.path.exists(file_path):
             return None
         
         timestamp = datetime.now().isoformat().replace(':', '-').replace('.', '-')
         backup_path = f"{file_path}.backup.{timestamp}"
         
-        shutil.copy2(file_path, backup_path)
+        await _copy2(file_path, backup_path)
         return backup_path
 
 class Logger:
-    """Utilidades para logging con colores"""
+    """Utilidades para logging del generador
+    
+    Los mensajes se envían al pipeline de logging (cola + escritor en segundo plano),
+    por lo que nunca hay escritura síncrona a stderr en el request. Los argumentos
+    adicionales se formatean de forma diferida con el estilo %% de logging.
+    """
     
     verbose = False
     enabled = True
     
+    _logger = logging.getLogger('crud_generator')
+    # Mensajes por archivo generado (muestreados por el pipeline de logging)
+    _file_logger = logging.getLogger('crud_generator.files')
+    
     @classmethod
     def set_verbose(cls, verbose: bool) -> None:
         cls.verbose = verbose
+        # El pipeline filtra por el nivel del logger raíz (INFO por defecto):
+        # en modo verbose el logger del generador deja pasar DEBUG
+        cls._logger.setLevel(logging.DEBUG if verbose else logging.NOTSET)
     
     @classmethod
     def set_enabled(cls, enabled: bool) -> None:
@@ -165,43 +213,51 @@ class Logger:
     def info(cls, message: str, *args) -> None:
         if not cls.enabled:
             return
-        print(f"ℹ {message}", *args, file=sys.stderr)
+        cls._logger.info("ℹ " + message, *args)
     
     @classmethod
-    def success(cls, message: str) -> None:
+    def success(cls, message: str, *args) -> None:
         if not cls.enabled:
             return
-        print(f"✓ {message}", file=sys.stderr)
+        cls._logger.info("✓ " + message, *args)
     
     @classmethod
-    def warning(cls, message: str) -> None:
+    def warning(cls, message: str, *args) -> None:
         if not cls.enabled:
             return
-        print(f"⚠ {message}", file=sys.stderr)
+        cls._logger.warning("⚠ " + message, *args)
     
     @classmethod
-    def error(cls, message: str) -> None:
+    def error(cls, message: str, *args) -> None:
         if not cls.enabled:
             return
-        print(f"✗ {message}", file=sys.stderr)
+        cls._logger.error("✗ " + message, *args)
     
     @classmethod
-    def debug(cls, message: str) -> None:
+    def debug(cls, message: str, *args) -> None:
         if not cls.enabled or not cls.verbose:
             return
-        print(f"🐛 {message}", file=sys.stderr)
+        cls._logger.debug("🐛 " + message, *args)
     
     @classmethod
-    def progress(cls, message: str) -> None:
+    def progress(cls, message: str, *args) -> None:
         if not cls.enabled:
             return
-        print(f"⚡ {message}", file=sys.stderr)
+        cls._logger.info("⚡ " + message, *args)
     
     @classmethod
     def step(cls, step: int, total: int, message: str) -> None:
+        progress.report('step', step=step, total=total, message=message)
         if not cls.enabled:
             return
-        print(f"[{step}/{total}] {message}", file=sys.stderr)
+        cls._logger.info("[%d/%d] %s", step, total, message)
+    
+    @classmethod
+    def file(cls, message: str, *args, level: int = logging.DEBUG) -> None:
+        """Mensaje por archivo individual (sujeto a muestreo)"""
+        if not cls.enabled or not cls._file_logger.isEnabledFor(level):
+            return
+        cls._file_logger.log(level, message, *args)
 
 class ValidationUtils:
     """Utilidades para validación"""
@@ -2,41 +2,41 @@
 Validadores para la configuración del generador CRUD (migrados desde TypeScript)
 """
 
-from typing import List, Dict, Any, Optional
-from pydantic import ValidationError as PydanticValidationError, BaseModel
-from model_types import ValidationResult, ValidationError, CRUDGeneratorConfig, EntityField, FieldType
+import os
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic import ValidationError as PydanticValidationError, BaseModel, TypeAdapter
+from model_types import (
+    ValidationResult, ValidationError, CRUDGeneratorConfig, EntityField, FieldType,
+    ItemValidationResult, BatchValidationResult
+)
 from utils import ValidationUtils, FileUtils, DependencyUtils
 
+# Adaptadores reutilizados entre requests (el esquema se compila una sola vez)
+_CONFIG_ADAPTER = TypeAdapter(CRUDGeneratorConfig)
+_FIELD_ADAPTER = TypeAdapter(EntityField)
+
 class CRUDValidator:
     """Clase principal para validación de configuraciones"""
     
     @staticmethod
     def validate(config_data: Dict[str, Any]) -> ValidationResult:
         """Valida una configuración completa del generador CRUD"""
+        return CRUDValidator._parse_config(config_data)[1]
+    
+    @staticmethod
+    def _parse_config(config_data: Dict[str, Any]) -> Tuple[Optional[CRUDGeneratorConfig], ValidationResult]:
+        """Construye el modelo y su resultado de validación (modelo None si es inválida)"""
         try:
-            config = CRUDGeneratorConfig.model_validate(config_data)
-            return ValidationResult(
-                valid=True,
-                errors=[],
-                warnings=CRUDValidator._generate_warnings(config)
-            )
+            config = _CONFIG_ADAPTER.validate_python(config_data)
+            return config, CRUDValidator.validate_model(config)
         except PydanticValidationError as e:
-            errors = []
-            for error in e.errors():
-                field_path = '.'.join(str(x) for x in error['loc'])
-                errors.append(ValidationError(
-                    field=field_path,
-                    message=error['msg'],
-                    code=error['type']
-                ))
-            
-            return ValidationResult(
+            return None, ValidationResult(
                 valid=False,
-                errors=errors,
+                errors=CRUDValidator._pydantic_errors(e),
                 warnings=[]
             )
         except Exception as e:
-            return ValidationResult(
+            return None, ValidationResult(
                 valid=False,
                 errors=[ValidationError(
                     field='unknown',
@@ -46,42 +46,72 @@ class CRUDValidator:
                 warnings=[]
             )
     
+    @staticmethod
+    def _pydantic_errors(e: PydanticValidationError) -> List[ValidationError]:
+        return [
+            ValidationError(
+                field='.'.join(str(x) for x in error['loc']),
+                message=error['msg'],
+                code=error['type']
+            )
+            for error in e.errors()
+        ]
+    
+    @staticmethod
+    def validate_model(config: CRUDGeneratorConfig) -> ValidationResult:
+        """Valida una configuración ya construida (y por lo tanto validada por Pydantic)
+        
+        Solo agrega las advertencias: no vuelve a serializar ni a validar el modelo.
+        """
+        return ValidationResult(
+            valid=True,
+            errors=[],
+            warnings=CRUDValidator._generate_warnings(config)
+        )
+    
     @staticmethod
     def _generate_warnings(config: CRUDGeneratorConfig) -> List[str]:
         """Genera advertencias para configuraciones válidas pero potencialmente problemáticas"""
         warnings = []
         
+        # Contadores en una sola pasada por los campos
+        fields_in_list = 0
+        searchable_fields = 0
+        sortable_fields = 0
+        preload_relations = 0
+        required_without_min = 0
+        for f in config.fields:
+            fields_in_list += f.show_in_list
+            searchable_fields += f.searchable
+            sortable_fields += f.sortable
+            if f.type == FieldType.RELATION and f.relation and f.relation.preload:
+                preload_relations += 1
+            elif f.required and f.type == FieldType.TEXT and (not f.validation or not f.validation.min):
+                required_without_min += 1
+        
         # Advertir si hay muchos campos en la lista
-        fields_in_list = [f for f in config.fields if f.show_in_list]
-        if len(fields_in_list) > 8:
-            warnings.append(f"Se mostrarán {len(fields_in_list)} campos en la tabla. Considera reducir el número para mejor UX.")
+        if fields_in_list > 8:
+            warnings.append(f"Se mostrarán {fields_in_list} campos en la tabla. Considera reducir el número para mejor UX.")
         
         # Advertir si no hay campos de búsqueda
-        searchable_fields = [f for f in config.fields if f.searchable]
-        if len(searchable_fields) == 0:
+        if searchable_fields == 0:
             warnings.append('No hay campos marcados como "searchable". Los usuarios no podrán buscar registros.')
         
         # Advertir si no hay campos ordenables
-        sortable_fields = [f for f in config.fields if f.sortable]
-        if len(sortable_fields) == 0:
+        if sortable_fields == 0:
             warnings.append('No hay campos marcados como "sortable". Los usuarios no podrán ordenar los registros.')
         
         # Advertir sobre relaciones con preload
-        preload_relations = [f for f in config.fields 
-                           if f.type == FieldType.RELATION and f.relation and f.relation.preload]
-        if len(preload_relations) > 0:
-            warnings.append(f"{len(preload_relations)} relación(es) tienen preload habilitado. Esto puede afectar el rendimiento si hay muchos registros.")
+        if preload_relations > 0:
+            warnings.append(f"{preload_relations} relación(es) tienen preload habilitado. Esto puede afectar el rendimiento si hay muchos registros.")
         
         # Advertir si entityNamePlural parece ser igual al singular
         if config.entity_name == config.entity_name_plural:
             warnings.append('El nombre plural parece ser igual al singular. Verifica que sea correcto.')
         
         # Advertir sobre campos obligatorios sin validación mínima
-        required_without_min = [f for f in config.fields 
-                              if f.required and f.type == FieldType.TEXT and 
-                              (not f.validation or not f.validation.min or f.validation.min == 0)]
-        if len(required_without_min) > 0:
-            warnings.append(f"{len(required_without_min)} campo(s) obligatorio(s) de texto no tienen validación mínima de caracteres.")
+        if required_without_min > 0:
+            warnings.append(f"{required_without_min} campo(s) obligatorio(s) de texto no tienen validación mínima de caracteres.")
         
         return warnings
     
@@ -89,19 +119,10 @@ class CRUDValidator:
     def validate_field(field_data: Dict[str, Any]) -> ValidationResult:
         """Valida solo la estructura de un campo"""
         try:
-            EntityField.model_validate(field_data)
+            _FIELD_ADAPTER.validate_python(field_data)
             return ValidationResult(valid=True, errors=[], warnings=[])
         except PydanticValidationError as e:
-            errors = []
-            for error in e.errors():
-                field_path = '.'.join(str(x) for x in error['loc'])
-                errors.append(ValidationError(
-                    field=field_path,
-                    message=error['msg'],
-                    code=error['type']
-                ))
-            
-            return ValidationResult(valid=False, errors=errors, warnings=[])
+            return ValidationResult(valid=False, errors=CRUDValidator._pydantic_errors(e), warnings=[])
         except Exception:
             return ValidationResult(
                 valid=False,
@@ -113,6 +134,99 @@ class CRUDValidator:
                 warnings=[]
             )
     
+    @staticmethod
+    def validate_batch(
+        configs: List[Dict[str, Any]],
+        fields: Optional[List[Dict[str, Any]]] = None,
+        allow_external_relations: bool = False
+    ) -> BatchValidationResult:
+        """Valida muchas configuraciones y campos sueltos en una sola llamada
+        
+        Además de la validación individual, revisa las configuraciones válidas entre
+        sí: nombres de entidad, endpoints y directorios destino repetidos, y que las
+        relaciones apunten a entidades del lote. Con allow_external_relations las
+        relaciones a entidades fuera del lote son advertencias y no errores.
+        """
+        config_results = []
+        models: List[Tuple[int, CRUDGeneratorConfig]] = []
+        for index, config_data in enumerate(configs):
+            config, validation = CRUDValidator._parse_config(config_data)
+            if config is not None:
+                name = config.entity_name
+            else:
+                name = config_data.get('entityName') if isinstance(config_data, dict) else None
+            config_results.append(ItemValidationResult(index=index, name=name, **validation.model_dump()))
+            if config is not None:
+                models.append((index, config))
+        
+        for index, problem in CRUDValidator._cross_entity_problems(models):
+            item = config_results[index]
+            if problem.code in CROSS_ENTITY_WARNINGS or (allow_external_relations and problem.code == 'unknown_relation_entity'):
+                item.warnings.append(f"{problem.field}: {problem.message}")
+            else:
+                item.errors.append(problem)
+                item.valid = False
+        
+        field_results = []
+        for index, field_data in enumerate(fields or []):
+            validation = CRUDValidator.validate_field(field_data)
+            name = field_data.get('name') if isinstance(field_data, dict) else None
+            field_results.append(ItemValidationResult(index=index, name=name, **validation.model_dump()))
+        
+        return BatchValidationResult(
+            valid=all(item.valid for item in config_results) and all(item.valid for item in field_results),
+            configs=config_results,
+            fields=field_results
+        )
+    
+    @staticmethod
+    def _cross_entity_problems(models: List[Tuple[int, CRUDGeneratorConfig]]) -> List[Tuple[int, ValidationError]]:
+        """Problemas entre configuraciones: (índice de la configuración, problema)"""
+        problems = []
+        seen: Dict[Tuple[str, str], int] = {}
+        
+        for index, config in models:
+            for field, key, code, label in (
+                ('entityName', config.entity_name.lower(), 'duplicate_entity', 'La entidad'),
+                ('apiEndpoint', _normalize_endpoint(config.api_endpoint), 'endpoint_collision', 'El endpoint'),
+                ('targetPath', os.path.abspath(config.target_path), 'duplicate_target_path', 'El directorio destino'),
+            ):
+                other = seen.setdefault((field, key), index)
+                if other != index:
+                    problems.append((index, ValidationError(
+                        field=field,
+                        message=f"{label} ya está definido en la configuración {other}",
+                        code=code
+                    )))
+        
+        # Las relaciones se resuelven por nombre de entidad (singular o plural)
+        by_name: Dict[str, CRUDGeneratorConfig] = {}
+        for _, config in models:
+            by_name.setdefault(config.entity_name.lower(), config)
+        for _, config in models:
+            by_name.setdefault(config.entity_name_plural.lower(), config)
+        
+        for index, config in models:
+            for position, field in enumerate(config.fields):
+                if field.type != FieldType.RELATION or not field.relation:
+                    continue
+                path = f"fields.{position}.relation"
+                target = by_name.get(field.relation.relation_entity.lower())
+                if target is None:
+                    problems.append((index, ValidationError(
+                        field=f"{path}.relationEntity",
+                        message=f"La entidad relacionada {field.relation.relation_entity} no está en el lote",
+                        code='unknown_relation_entity'
+                    )))
+                elif not _is_endpoint_of(field.relation.endpoint, target.api_endpoint):
+                    problems.append((index, ValidationError(
+                        field=f"{path}.endpoint",
+                        message=f"El endpoint {field.relation.endpoint} no es el de {target.entity_name} ({target.api_endpoint}) ni una de sus sub-rutas",
+                        code='relation_endpoint_mismatch'
+                    )))
+        
+        return problems
+    
     @staticmethod
     async def validate_target_path(target_path: str) -> ValidationResult:
         """Valida que un path de destino sea escribible"""
@@ -191,6 +305,19 @@ class CRUDValidator:
             warnings=warnings
         )
 
+# Problemas entre entidades que se informan como advertencias
+CROSS_ENTITY_WARNINGS = ('relation_endpoint_mismatch',)
+
+def _normalize_endpoint(endpoint: str) -> str:
+    return '/' + endpoint.strip().strip('/').lower()
+
+
+def _is_endpoint_of(endpoint: str, api_endpoint: str) -> bool:
+    """True si endpoint es el apiEndpoint de la entidad o una de sus sub-rutas (p. ej. /search)"""
+    endpoint = _normalize_endpoint(endpoint.split('?', 1)[0])
+    base = _normalize_endpoint(api_endpoint)
+    return endpoint == base or endpoint.startswith(base.rstrip('/') + '/')
+
 class FieldValidators:
     """Helpers para validación específica de tipos de campo"""
     